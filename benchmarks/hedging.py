@@ -0,0 +1,109 @@
+"""
+Measure how request hedging changes the latency of zone lookups against a server with stragglers.
+
+A local HTTP server answers every fifth request after a delay, and the same zone lookups are timed with and without
+hedging. The numbers depend on the machine, so this is a benchmark to run by hand, not a test:
+
+    python benchmarks/hedging.py --lookups 200 --straggler-delay 0.3 --hedge-after 0.05
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+from certbot_dns_stackit.client import _StackitClient
+
+
+class _StragglerHandler(BaseHTTPRequestHandler):
+    """Answers every fifth request after `delay` seconds."""
+
+    delay = 0.3
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        """Answer a zone lookup with a single zone."""
+        with self.lock:
+            type(self).requests += 1
+            straggler = type(self).requests % 5 == 0
+        if straggler:
+            time.sleep(self.delay)
+        body = json.dumps({"zones": [{"id": "zone_1"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Keep the output free of access logs."""
+
+
+def _lookups(client: _StackitClient, count: int) -> List[float]:
+    """
+    Time zone lookups of a client.
+
+    :param client: The client sending the lookups.
+    :param count: The number of lookups.
+    :return: The latency of each lookup in seconds.
+    """
+    latencies = []
+    for _ in range(count):
+        start = time.monotonic()
+        client._get_zone_id("example.com")
+        latencies.append(time.monotonic() - start)
+    return latencies
+
+
+def _report(name: str, latencies: List[float]):
+    """
+    Print the median, the 99th percentile and the maximum of latencies.
+
+    :param name: The name of the measured configuration.
+    :param latencies: The latencies in seconds.
+    """
+    latencies = sorted(latencies)
+    p50 = latencies[math.ceil(0.5 * len(latencies)) - 1]
+    p99 = latencies[math.ceil(0.99 * len(latencies)) - 1]
+    print(
+        f"{name:>8}: p50 {p50 * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  max {latencies[-1] * 1000:6.1f} ms"
+    )
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--straggler-delay", type=float, default=0.3)
+    parser.add_argument("--hedge-after", type=float, default=0.05)
+    parser.add_argument("--hedge-budget", type=float, default=0.25)
+    args = parser.parse_args()
+
+    _StragglerHandler.delay = args.straggler_delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StragglerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        plain = _StackitClient("token", "project", base_url)
+        _report("plain", _lookups(plain, args.lookups))
+
+        hedged = _StackitClient(
+            "token",
+            "project",
+            base_url,
+            hedge_after=args.hedge_after,
+            hedge_budget=args.hedge_budget,
+        )
+        _report("hedged", _lookups(hedged, args.lookups))
+        print(f"{hedged._hedges} hedges for {hedged._gets} requests")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
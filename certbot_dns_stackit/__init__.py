@@ -10,7 +10,13 @@ for DNS-01 challenge type. The module contains two main classes:
   the required validation token to a STACKIT DNS record.
 
 - _StackitClient: This is an internal helper class that facilitates interactions
-  with the STACKIT DNS API.
+  with the STACKIT DNS API. It lives in the `client` module, which does not need certbot.
+
+The `renewal` module additionally provides `renew_all`, which issues many certificates
+with a single DNS propagation wait instead of one wait per certificate, using clients
+created by `client.create_client`, and the `hooks`
+module provides the `stackit-dns-present` and `stackit-dns-cleanup` commands for ACME
+clients other than certbot.
 
 Note:
     The `_StackitClient` class is intended for internal use within this module and
@@ -28,6 +34,13 @@ For further details on each class and their methods, refer to their respective d
 
 """
 
-from .stackit import Authenticator
-
 __all__ = ["Authenticator"]
+
+
+def __getattr__(name):
+    # certbot is only imported when the authenticator is used, so the hooks start fast
+    if name == "Authenticator":
+        from .stackit import Authenticator
+
+        return Authenticator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
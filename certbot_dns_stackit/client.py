@@ -0,0 +1,1664 @@
+import base64
+import collections
+import contextlib
+import fcntl
+import functools
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait, as_completed
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    List,
+    Callable,
+    TypedDict,
+    Dict,
+    Tuple,
+    Any,
+    Iterator,
+    Protocol,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StackitError(Exception):
+    """Represents a failed operation against the STACKIT APIs."""
+
+
+class _ZoneNotFoundError(StackitError):
+    """Represents a domain without a zone in the project of a client."""
+
+
+class _TransportError(Exception):
+    """Represents a request that failed without a response, e.g. because of a timeout."""
+
+
+# connect and read timeout in seconds for all requests to the STACKIT APIs
+_TIMEOUT = (5.0, 30.0)
+
+# the number of threads sending read-only requests at the same time when hedging is enabled
+_HEDGE_WORKERS = 8
+
+_TOKEN_URL = "https://service-account.api.stackit.cloud/token"
+
+_BASE_URL = "https://dns.api.stackit.cloud"
+
+# the fields of an entry of the cleanup queue
+_QUEUE_FIELDS = ("domain", "validation_name", "validation", "attempts")
+
+
+class _Response(Protocol):
+    """The parts of an HTTP response used by the clients, as provided by both transports."""
+
+    status_code: int
+    headers: Any
+
+    @property
+    def text(self) -> str:
+        """Return the body of the response as text."""
+
+    def json(self) -> Any:
+        """Decode the JSON body of the response."""
+
+
+class _Transport(Protocol):
+    """Sends HTTP requests for the clients."""
+
+    def request(self, method: str, url: str, **kwargs: Any) -> _Response:
+        """Send a request, raising `_TransportError` if it failed without a response."""
+
+
+class _RequestsTransport(object):
+    """Sends requests with `requests`."""
+
+    def request(self, method: str, url: str, **kwargs: Any) -> _Response:
+        """
+        Send a request.
+
+        :param method: The HTTP method, e.g. "get".
+        :param url: The URL of the request.
+        :param kwargs: Additional arguments passed to `requests`, e.g. `headers`, `json`, `data` and `timeout`.
+        :return: The response, whatever its status.
+        :raises _TransportError: If the request failed without a response.
+        """
+        # imported here, so the standalone hooks using the urllib transport do not pay for loading requests
+        import requests
+
+        try:
+            return getattr(requests, method)(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            raise _TransportError(str(e)) from e
+
+
+@dataclass
+class _UrllibResponse:
+    """Represents a response received by the urllib transport."""
+
+    status_code: int
+    headers: Any
+    content: bytes
+
+    @property
+    def text(self) -> str:
+        """Return the body of the response as text."""
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        """Decode the JSON body of the response."""
+        return json.loads(self.content)
+
+
+class _UrllibTransport(object):
+    """
+    Sends requests with the standard library.
+
+    Used by the standalone hooks, which only send a few requests per run, so importing `requests` would take longer
+    than the requests themselves.
+    """
+
+    def request(self, method: str, url: str, **kwargs: Any) -> _Response:
+        """
+        Send a request.
+
+        :param method: The HTTP method, e.g. "get".
+        :param url: The URL of the request.
+        :param kwargs: `headers`, `timeout`, and a `json` or form encoded `data` body, like for `requests`.
+        :return: The response, whatever its status.
+        :raises _TransportError: If the request failed without a response.
+        """
+        import urllib.error
+        import urllib.parse
+        import urllib.request
+
+        headers = dict(kwargs.get("headers") or {})
+        body = None
+        if kwargs.get("json") is not None:
+            body = json.dumps(kwargs["json"]).encode()
+            headers.setdefault("Content-Type", "application/json")
+        elif kwargs.get("data") is not None:
+            body = urllib.parse.urlencode(kwargs["data"]).encode()
+        # urllib has a single timeout for connecting and each read
+        timeout = kwargs.get("timeout", _TIMEOUT)
+        if isinstance(timeout, tuple):
+            timeout = max(timeout)
+
+        request = urllib.request.Request(
+            url, data=body, headers=headers, method=method.upper()
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return _UrllibResponse(
+                    response.status, response.headers, response.read()
+                )
+        except urllib.error.HTTPError as e:
+            # urllib raises on error statuses and 304, which the clients handle as responses
+            with e:
+                return _UrllibResponse(e.code, e.headers, e.read())
+        except OSError as e:
+            raise _TransportError(str(e)) from e
+
+
+@dataclass
+class Record:
+    """Represents a Record."""
+
+    content: str
+    id: str
+
+
+@dataclass
+class RRSet:
+    """Represents a RRSet."""
+
+    id: str
+    records: List[Record]
+    state: Optional[str] = None
+
+
+@dataclass
+class PlannedChange:
+    """
+    Represents a TXT record change resolved ahead of any write.
+
+    Attributes:
+        domain (str): The domain the challenge was issued for.
+        validation_name (str): The acme challenge record name.
+        zone_id (str): The ID of the zone the record will be written to.
+        zone_name (str): The dnsName of that zone.
+        action (str): The write needed: "create" (POST rrset), "add" (PATCH records) or "none".
+        rrset_id (str): The ID of the existing rrset, if any.
+    """
+
+    domain: str
+    validation_name: str
+    zone_id: str
+    zone_name: str
+    action: str
+    rrset_id: Optional[str] = None
+
+
+class ServiceFileCredentials(TypedDict):
+    """
+    Represents the credentials obtained from a service file for authentication.
+
+    Attributes:
+        iss (str): The issuer of the token, typically the email address of the service account.
+        sub (str): The subject of the token, usually the same as `iss` unless acting on behalf of another user.
+        aud (str): The audience for the token, indicating the intended recipient, usually the authentication URL.
+        kid (str): The key ID used for identifying the private key corresponding to the public key.
+        privateKey (str): The private key used to sign the authentication token.
+    """
+
+    iss: str
+    sub: str
+    aud: str
+    kid: str
+    privateKey: str
+
+
+@dataclass
+class _PooledToken:
+    """
+    Represents the access token of one service account within a token pool.
+
+    Attributes:
+        token (str): The current access token.
+        refresh (Callable): Obtains a new access token, if the token can be renewed.
+        in_flight (int): The number of requests currently using the token.
+        uses (int): The number of requests that used the token so far.
+        sidelined_until (float): The monotonic time until which the token is not used.
+        refreshing (bool): Whether the token is being renewed right now.
+    """
+
+    token: str
+    refresh: Optional[Callable[[], str]] = None
+    in_flight: int = 0
+    uses: int = 0
+    sidelined_until: float = 0.0
+    refreshing: bool = False
+
+
+class _TokenPool(object):
+    """
+    Spreads requests across the access tokens of several service accounts of the same project.
+
+    Every request uses the least loaded token. A token answered with 429 is sidelined until the rate limit is
+    over, a token answered with 401 is renewed or, if it cannot be renewed, sidelined. While every token is
+    sidelined, requests wait for the first one to become available again instead of being sent anyway.
+
+    Attributes:
+        tokens (list): The pooled tokens.
+        rate_limit_seconds (int): How long a rate limited token is sidelined without a Retry-After header.
+        unauthorized_seconds (int): How long a rejected token that cannot be renewed is sidelined.
+        max_wait_seconds (float): How long a request waits for a sidelined token before it fails.
+    """
+
+    def __init__(
+        self,
+        tokens: List[_PooledToken],
+        rate_limit_seconds: int = 30,
+        unauthorized_seconds: int = 300,
+        max_wait_seconds: float = 60,
+    ):
+        """
+        Initialize the TokenPool.
+
+        :param tokens: The pooled tokens.
+        :param rate_limit_seconds: How long a rate limited token is sidelined without a Retry-After header.
+        :param unauthorized_seconds: How long a rejected token that cannot be renewed is sidelined.
+        :param max_wait_seconds: How long a request waits for a sidelined token before it fails.
+        """
+        self.tokens = tokens
+        self.rate_limit_seconds = rate_limit_seconds
+        self.unauthorized_seconds = unauthorized_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def acquire(self) -> _PooledToken:
+        """
+        Pick the token for the next request, waiting while every token is sidelined.
+
+        :return: The least loaded available token.
+        :raises StackitError: If no token becomes available within `max_wait_seconds`.
+        """
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                available = [t for t in self.tokens if t.sidelined_until <= now]
+                if available:
+                    token = min(available, key=lambda t: (t.in_flight, t.uses))
+                    token.in_flight += 1
+                    token.uses += 1
+                    return token
+                until = min(t.sidelined_until for t in self.tokens)
+
+            if until > deadline:
+                raise StackitError(
+                    f"All {len(self.tokens)} access token(s) are rate limited or rejected for another "
+                    f"{math.ceil(until - now)} seconds"
+                )
+            time.sleep(until - now)
+
+    def release(self, token: _PooledToken, response: Optional[_Response]):
+        """
+        Return a token after its request, sidelining or renewing it depending on the response.
+
+        :param token: The token used for the request.
+        :param response: The response of the request, None if the request failed without one.
+        """
+        refresh = None
+        with self._lock:
+            token.in_flight -= 1
+            if response is not None and response.status_code == 429:
+                try:
+                    seconds = float(response.headers.get("Retry-After", ""))
+                except (TypeError, ValueError):
+                    seconds = self.rate_limit_seconds
+                token.sidelined_until = time.monotonic() + seconds
+            elif response is not None and response.status_code == 401:
+                if not token.refreshing:
+                    token.sidelined_until = time.monotonic() + self.unauthorized_seconds
+                # concurrent 401s of the same token renew it only once
+                if token.refresh is not None and not token.refreshing:
+                    token.refreshing = True
+                    refresh = token.refresh
+
+        if refresh is not None:
+            try:
+                renewed = refresh()
+            except StackitError as e:
+                logger.warning(f"Could not renew access token: {e}")
+                renewed = None
+            with self._lock:
+                token.refreshing = False
+                if renewed is not None:
+                    token.token = renewed
+                    token.sidelined_until = 0.0
+
+
+class _CircuitBreaker(object):
+    """
+    Fails requests to an endpoint immediately after the endpoint failed repeatedly.
+
+    After `failure_threshold` consecutive failures the circuit opens and every request fails fast. Once
+    `reset_seconds` have passed, a single probe request is let through: its success closes the circuit again,
+    its failure keeps it open for another `reset_seconds`.
+
+    Attributes:
+        endpoint (str): The endpoint guarded by the circuit breaker, used in error messages.
+        failure_threshold (int): The number of consecutive failures that open the circuit.
+        reset_seconds (float): How long the circuit stays open before a probe is let through.
+    """
+
+    def __init__(
+        self, endpoint: str, failure_threshold: int = 5, reset_seconds: float = 30
+    ):
+        """
+        Initialize the CircuitBreaker.
+
+        :param endpoint: The endpoint guarded by the circuit breaker, used in error messages.
+        :param failure_threshold: The number of consecutive failures that open the circuit.
+        :param reset_seconds: How long the circuit stays open before a probe is let through.
+        """
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """
+        Check whether a request may be sent.
+
+        :raises StackitError: If the circuit is open.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                raise StackitError(
+                    f"{self.endpoint} failed {self._failures} times in a row, failing fast until it recovers"
+                )
+            self._probing = True
+
+    def success(self):
+        """Record a successful request, closing the circuit."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        """Record a failed request, opening the circuit once the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        f"{self.endpoint} failed {self._failures} times in a row, pausing requests for "
+                        f"{self.reset_seconds} seconds"
+                    )
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# the circuit breakers of all endpoints, shared by every client of the process
+_circuit_breakers: Dict[str, _CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def _circuit_breaker(endpoint: str) -> _CircuitBreaker:
+    """
+    Return the circuit breaker of an endpoint, so clients of several projects share what they learn about it.
+
+    :param endpoint: The base URL of the endpoint.
+    :return: The circuit breaker shared by all requests to the endpoint.
+    """
+    with _circuit_breakers_lock:
+        if endpoint not in _circuit_breakers:
+            _circuit_breakers[endpoint] = _CircuitBreaker(endpoint)
+        return _circuit_breakers[endpoint]
+
+
+@dataclass
+class _CachedResponse:
+    """Represents a successful read-only API response held by a response cache."""
+
+    response: _Response
+    etag: Optional[str]
+    stored_at: float
+
+
+class _ResponseCache(object):
+    """
+    A bounded LRU cache of successful read-only API responses.
+
+    Responses carrying an ETag are revalidated with a conditional request before they are reused, responses
+    without one are reused for `ttl` seconds. Every write of the client invalidates the cached responses of the
+    written zone, and responses to requests that were in flight during an invalidation are not stored.
+
+    Attributes:
+        ttl (float): How long responses without an ETag are reused, in seconds. 0 only caches responses with an ETag.
+        max_entries (int): The maximum number of cached responses.
+        generation (int): The number of invalidations so far.
+    """
+
+    def __init__(self, ttl: float = 0, max_entries: int = 256):
+        """
+        Initialize the ResponseCache.
+
+        :param ttl: How long responses without an ETag are reused, in seconds. 0 only caches responses with an ETag.
+        :param max_entries: The maximum number of cached responses.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[_CachedResponse]:
+        """
+        Look up the cached response of a URL.
+
+        :param url: The URL of the request.
+        :return: The cached response if it is still usable or can be revalidated; otherwise, None.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            if entry.etag is None and time.monotonic() - entry.stored_at >= self.ttl:
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, response: _Response, generation: int):
+        """
+        Store a response, unless the cache was invalidated since its request was sent.
+
+        :param url: The URL of the request.
+        :param response: The successful response.
+        :param generation: The generation of the cache when the request was sent.
+        """
+        etag = response.headers.get("ETag")
+        if etag is None and self.ttl <= 0:
+            return
+
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[url] = _CachedResponse(response, etag, time.monotonic())
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, zone_id: str):
+        """
+        Drop all cached responses of a zone.
+
+        :param zone_id: The ID of the zone that was written to.
+        """
+        with self._lock:
+            self.generation += 1
+            for url in [url for url in self._entries if f"/zones/{zone_id}/" in url]:
+                del self._entries[url]
+
+
+class _StackitClient(object):
+    """
+    A client to interact with the STACKIT DNS API.
+
+    Attributes:
+        auth_token (str): The authentication token for the API.
+        project_id (str): The project ID associated with the domain (zone).
+        base_url (str): The base URL endpoint for the STACKIT API.
+        headers (dict): The headers to be used in API requests.
+    """
+
+    def __init__(
+        self,
+        auth_token: str,
+        project_id: str,
+        base_url: str,
+        token_pool: Optional[_TokenPool] = None,
+        timeout: Tuple[float, float] = _TIMEOUT,
+        hedge_after: Optional[float] = None,
+        hedge_budget: float = 0.1,
+        parallel_probes: int = 0,
+        cache_ttl: float = 0,
+        transport: Optional[_Transport] = None,
+    ):
+        """
+        Initialize the StackitClient.
+
+        :param auth_token: The authentication token for the API.
+        :param project_id: The project ID associated with the domain (zone).
+        :param base_url: The base URL endpoint for the STACKIT API.
+        :param token_pool: The tokens to spread the requests across. Defaults to a pool of `auth_token` only.
+        :param timeout: The connect and read timeout of each request in seconds.
+        :param hedge_after: Seconds after which a read-only request is sent a second time if it has not been
+            answered yet. Once enough requests were measured, their 95th percentile latency is used instead.
+            None disables hedging.
+        :param hedge_budget: The maximum share of read-only requests that may be sent a second time.
+        :param parallel_probes: The number of domain suffixes probed at the same time when looking up a zone.
+            0 or 1 probes them one after another.
+        :param cache_ttl: How long read-only responses without an ETag are reused, in seconds. Responses with an
+            ETag are always cached and revalidated.
+        :param transport: Sends the HTTP requests, defaults to `requests`.
+        """
+        self.auth_token = auth_token
+        self.project_id = project_id
+        self.base_url = base_url
+        self.headers = {"Authorization": f"Bearer {self.auth_token}"}
+        self.token_pool = token_pool or _TokenPool([_PooledToken(auth_token)])
+        self.timeout = timeout
+        self.circuit_breaker = _circuit_breaker(base_url)
+        self.hedge_after = hedge_after
+        self.hedge_budget = hedge_budget
+        self._lock = threading.Lock()
+        self._hedge_workers_busy = 0
+        self._latencies: deque = deque(maxlen=100)
+        self._gets = 0
+        self._hedges = 0
+        self.parallel_probes = parallel_probes
+        self._probe_pool: Optional[ThreadPoolExecutor] = None
+        self.response_cache = _ResponseCache(ttl=cache_ttl)
+        self._zone_index: Optional[Dict[str, str]] = None
+        self.transport = transport or _RequestsTransport()
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> _Response:
+        """
+        Send a request to the API with a token from the token pool.
+
+        A request answered with 401 or 429 is repeated with another token, at most once per pooled token.
+        Connection errors, timeouts and 5xx responses count as failures of the endpoint's circuit breaker.
+        Any write invalidates the cached responses of the zone it writes to.
+
+        :param method: The HTTP method, e.g. "get".
+        :param url: The URL of the request.
+        :param kwargs: Additional arguments passed to the transport.
+        :return: The response of the last attempt.
+        :raises StackitError: If the request fails without a response or the circuit breaker is open.
+        """
+        if method == "get":
+            return self._send(method, url, **kwargs)
+
+        try:
+            return self._send(method, url, **kwargs)
+        finally:
+            zone = re.search(r"/zones/([^/?]+)", url)
+            if zone is not None:
+                self.response_cache.invalidate(zone.group(1))
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> _Response:
+        """
+        Send a request with the tokens of the token pool, see `_request`.
+
+        :param method: The HTTP method, e.g. "get".
+        :param url: The URL of the request.
+        :param kwargs: Additional arguments passed to the transport.
+        :return: The response of the last attempt.
+        """
+        headers = kwargs.pop("headers", {})
+        attempts = len(self.token_pool)
+        while True:
+            self.circuit_breaker.before()
+            token = self.token_pool.acquire()
+            try:
+                res = self.transport.request(
+                    method,
+                    url,
+                    headers={"Authorization": f"Bearer {token.token}", **headers},
+                    timeout=self.timeout,
+                    **kwargs,
+                )
+            except Exception as e:
+                self.token_pool.release(token, None)
+                self.circuit_breaker.failure()
+                if isinstance(e, _TransportError):
+                    raise StackitError(f"Request to {url} failed: {e}")
+                raise
+            self.token_pool.release(token, res)
+
+            if res.status_code >= 500:
+                self.circuit_breaker.failure()
+            else:
+                self.circuit_breaker.success()
+
+            attempts -= 1
+            if res.status_code not in (401, 429) or attempts == 0:
+                return res
+
+    def _get(self, url: str, use_cache: bool = True) -> _Response:
+        """
+        Send a read-only request, answering it from the response cache where possible.
+
+        :param url: The URL of the request.
+        :param use_cache: Whether a cached response may be used. The received response is cached either way.
+        :return: The cached or received response.
+        """
+        cached = self.response_cache.get(url) if use_cache else None
+        if cached is not None and cached.etag is None:
+            return cached.response
+
+        generation = self.response_cache.generation
+        if cached is not None:
+            res = self._hedged_get(url, headers={"If-None-Match": cached.etag})
+            if res.status_code == 304:
+                return cached.response
+        else:
+            res = self._hedged_get(url)
+
+        if res.status_code == 200:
+            self.response_cache.put(url, res, generation)
+        return res
+
+    def _hedged_get(self, url: str, **kwargs: Any) -> _Response:
+        """
+        Send a read-only request, hedging it if enabled.
+
+        If the request has not been answered after the hedge delay and the hedge budget allows it, the same
+        request is sent again and the first successful response is used. A response with an error status only
+        wins once no other request is left. Requests are only handed to the hedge workers while one of them is
+        free, so they never queue behind straggling requests; if all workers are busy, the request is sent
+        from the calling thread without hedging.
+
+        :param url: The URL of the request.
+        :param kwargs: Additional arguments passed to the transport.
+        :return: The first successful response, or the last response if none succeeded.
+        """
+        if self.hedge_after is None:
+            return self._request("get", url, **kwargs)
+
+        with self._lock:
+            self._gets += 1
+
+        start = time.monotonic()
+        primary = self._submit_get(url, **kwargs)
+        if primary is None:
+            return self._request("get", url, **kwargs)
+
+        futures = [primary]
+        done, _ = wait(futures, timeout=self._hedge_delay())
+        if not done and self._take_hedge():
+            hedge = self._submit_get(url, **kwargs)
+            if hedge is not None:
+                logger.debug(f"Hedging request to {url}")
+                futures.append(hedge)
+
+        failures = []
+        fallback = None
+        for future in as_completed(futures):
+            try:
+                res = future.result()
+            except StackitError as e:
+                failures.append(e)
+                continue
+            if res.status_code >= 300 and res.status_code != 304:
+                fallback = fallback or res
+                continue
+            with self._lock:
+                self._latencies.append(time.monotonic() - start)
+            return res
+        if fallback is not None:
+            return fallback
+        raise failures[0]
+
+    def _submit_get(self, url: str, **kwargs: Any) -> Optional[Future]:
+        """
+        Hand a read-only request to a free hedge worker.
+
+        Each worker is a daemon thread sending a single request, so a request that lost the race against its hedge
+        does not keep the interpreter from exiting until it times out.
+
+        :param url: The URL of the request.
+        :param kwargs: Additional arguments passed to the transport.
+        :return: The future of the request, or None if every worker is busy.
+        """
+        with self._lock:
+            if self._hedge_workers_busy >= _HEDGE_WORKERS:
+                return None
+            self._hedge_workers_busy += 1
+
+        future: Future = Future()
+        future.add_done_callback(self._release_hedge_worker)
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(self._request("get", url, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="stackit-hedge", daemon=True).start()
+        return future
+
+    def _release_hedge_worker(self, future: Future):
+        """
+        Mark the hedge worker of a finished request as free.
+
+        :param future: The future of the finished request.
+        """
+        with self._lock:
+            self._hedge_workers_busy -= 1
+
+    def _hedge_delay(self) -> float:
+        """
+        Compute how long to wait for a response before hedging a request.
+
+        :return: The 95th percentile of the measured latencies, or `hedge_after` until 20 requests were measured.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < 20 or self.hedge_after is None:
+            return self.hedge_after or 0.0
+        return latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+    def _take_hedge(self) -> bool:
+        """
+        Reserve a hedged request if the hedge budget allows it.
+
+        :return: True if a hedged request may be sent; otherwise, False.
+        """
+        with self._lock:
+            # the first hedge is always allowed, later ones only within the budget
+            if self._hedges > self.hedge_budget * self._gets:
+                return False
+            self._hedges += 1
+            return True
+
+    def add_txt_record(self, domain: str, validation_name: str, validation: str):
+        """
+        Add a TXT record using the supplied information.
+
+        :param domain: The domain one level above the validation name.
+        :param validation_name: The acme challenge record name.
+        :param validation: The acme challenge record content.
+        """
+        zone_id = self._get_zone_id(domain)
+        self._write_txt_record(zone_id, validation_name, validation)
+
+    def apply(self, change: PlannedChange, validation: str):
+        """
+        Carry out a planned change without looking up its zone and rrset again.
+
+        :param change: The change planned by `plan` for the record.
+        :param validation: The acme challenge record content.
+        """
+        if change.action == "create":
+            self._create_rrset(change.zone_id, change.validation_name, validation)
+        elif change.action == "add" and change.rrset_id is not None:
+            self._add_record_to_rrset(change.zone_id, change.rrset_id, validation)
+        elif change.action == "add":
+            # the rrset is created by an earlier change of the same plan, so its ID is not known yet
+            self._write_txt_record(change.zone_id, change.validation_name, validation)
+
+    def _write_txt_record(self, zone_id: str, validation_name: str, validation: str):
+        """
+        Add a TXT record to a zone, creating its rrset if needed.
+
+        :param zone_id: The zone ID where the record will be added.
+        :param validation_name: The acme challenge record name.
+        :param validation: The acme challenge record content.
+        """
+        rrset = self._get_rrset(zone_id, validation_name)
+        # rrset does not exist therefore add it
+        if rrset is None:
+            self._create_rrset(zone_id, validation_name, validation)
+        else:
+            # rrset exists. If it does not contain the validation record, add it
+            records = [record.content for record in rrset.records]
+            if validation not in records:
+                self._add_record_to_rrset(zone_id, rrset.id, validation)
+
+    def _create_rrset(self, zone_id: str, validation_name: str, validation: str):
+        """
+        Create a new rrset for the supplied zone id.
+
+        :param zone_id: The zone ID where the rrset will be created.
+        :param validation_name: The record name.
+        :param validation: The record content.
+        """
+        # append a dot if the validation name does not end with a dot
+        if not validation_name.endswith("."):
+            validation_name = f"{validation_name}."
+
+        body = {
+            "name": validation_name,
+            "type": "TXT",
+            "ttl": 60,
+            "records": [
+                {
+                    "content": validation,
+                }
+            ],
+        }
+
+        res = self._request(
+            "post",
+            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets",
+            json=body,
+        )
+
+        if res.status_code != 202:
+            raise StackitError(
+                f"Could not create rrset for zone id {zone_id}. Response: {res.text}"
+            )
+
+    def _add_record_to_rrset(self, zone_id: str, rrset_id: str, validation: str):
+        """
+        Add a record to an existing rrset.
+
+        :param zone_id: The zone ID where the rrset is located.
+        :param rrset_id: The rrset ID where the record will be added.
+        :param validation: The record content.
+        """
+        body = {
+            "action": "add",
+            "records": [
+                {
+                    "content": validation,
+                }
+            ],
+        }
+
+        res = self._request(
+            "patch",
+            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets/{rrset_id}/records",
+            json=body,
+        )
+
+        if res.status_code != 202:
+            raise StackitError(
+                f"Could not add record to rrset {rrset_id}. Response: {res.text}"
+            )
+
+    def _get_zone_id(self, domain: str) -> str:
+        """
+        Retrieve the zone ID for the given domain.
+
+        :param domain: The domain (zone dnsName) for which the zone ID is needed.
+        :return: The ID of the zone.
+        """
+        if self._zone_index is not None:
+            zone = self._find_zone(domain)
+        else:
+            zone = self._probe_zones(domain)
+        if zone is None:
+            raise _ZoneNotFoundError(
+                f"Could not find zone id for domain {domain} in project {self.project_id}"
+            )
+        return zone[1]
+
+    def _probe_zones(self, domain: str) -> Optional[Tuple[str, str]]:
+        """
+        Find the most specific zone containing a domain by probing each of its suffixes.
+
+        :param domain: Any domain name.
+        :return: A tuple of zone dnsName and zone ID if found; otherwise, None.
+        """
+        parts = domain.rstrip(".").split(".")
+
+        # we are searching for the best matching zone. We can do that by iterating over the parts of the domain
+        # from left to right. With parallel probes, up to `parallel_probes` suffixes are probed at the same time
+        # and the most specific match of the first batch with any match wins.
+        subdomains = [".".join(parts[i:]) for i in range(len(parts))]
+        batch_size = max(1, self.parallel_probes)
+        for start in range(0, len(subdomains), batch_size):
+            end = start + batch_size
+            batch = subdomains[start:end]
+            if len(batch) == 1:
+                results = [self._probe_zone(batch[0])]
+            else:
+                results = list(self._probe_executor().map(self._probe_zone, batch))
+
+            for subdomain, (zone_id, _) in zip(batch, results):
+                if zone_id is not None:
+                    return subdomain.lower(), zone_id
+        return None
+
+    def _probe_zone(self, subdomain: str) -> Tuple[Optional[str], _Response]:
+        """
+        Look up the active zone with exactly the given dnsName.
+
+        :param subdomain: The dnsName to look up.
+        :return: The ID of the zone if found, otherwise None, together with the response.
+        """
+        res = self._get(
+            f"{self.base_url}/v1/projects/{self.project_id}/zones?dnsName[eq]={subdomain}&active[eq]=true",
+        )
+        if res.status_code == 200 and len(res.json()["zones"]) > 0:
+            return res.json()["zones"][0]["id"], res
+        return None, res
+
+    def _probe_executor(self) -> ThreadPoolExecutor:
+        """
+        Return the thread pool running parallel zone probes, creating it on first use.
+
+        :return: A thread pool with `parallel_probes` workers.
+        """
+        with self._lock:
+            if self._probe_pool is None:
+                self._probe_pool = ThreadPoolExecutor(max_workers=self.parallel_probes)
+            return self._probe_pool
+
+    def _load_zone_index(self) -> Dict[str, str]:
+        """
+        Fetch all active zones of the project in one listing and keep them as an index.
+
+        Once loaded, `_get_zone_id` resolves domains from the index instead of probing every suffix.
+
+        :return: A mapping of zone dnsName to zone ID.
+        """
+        index: Dict[str, str] = {}
+        page = 1
+        while True:
+            res = self._get(
+                f"{self.base_url}/v1/projects/{self.project_id}/zones?active[eq]=true&page={page}&pageSize=100",
+            )
+            if res.status_code != 200:
+                raise StackitError(
+                    f"Could not list zones for project {self.project_id}. Response: {res.text}"
+                )
+
+            data = res.json()
+            for zone in data["zones"]:
+                index[zone["dnsName"].rstrip(".").lower()] = zone["id"]
+
+            if page >= data.get("totalPages", 1):
+                break
+            page += 1
+
+        self._zone_index = index
+        return index
+
+    def _find_zone(self, domain: str) -> Optional[Tuple[str, str]]:
+        """
+        Find the most specific zone in the zone index that contains the given domain.
+
+        :param domain: Any domain name.
+        :return: A tuple of zone dnsName and zone ID if found; otherwise, None.
+        """
+        index = self._zone_index or {}
+        parts = domain.rstrip(".").lower().split(".")
+        for i in range(len(parts)):
+            subdomain = ".".join(parts[i:])
+            if subdomain in index:
+                return subdomain, index[subdomain]
+        return None
+
+    def _resolve_zones(self, domains: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Find the zones of several domains.
+
+        A single domain is resolved by probing its suffixes, which costs at most one request per label instead of
+        listing every zone of a possibly large project. With `parallel_probes`, every domain is resolved by
+        probing its suffixes in parallel batches. Otherwise, more domains are resolved against the zone index.
+
+        :param domains: The domains to resolve.
+        :return: Tuples of zone dnsName and zone ID, keyed by domain. Domains without a zone are left out.
+        """
+        if self._zone_index is None and (len(domains) == 1 or self.parallel_probes > 0):
+            probed = {}
+            for domain in domains:
+                zone = self._probe_zones(domain)
+                if zone is not None:
+                    probed[domain] = zone
+            return probed
+
+        if self._zone_index is None:
+            self._load_zone_index()
+        zones = {}
+        for domain in domains:
+            zone = self._find_zone(domain)
+            if zone is not None:
+                zones[domain] = zone
+        return zones
+
+    def plan(self, challenges: List[Tuple[str, str, str]]) -> List[PlannedChange]:
+        """
+        Resolve and check every challenge before anything is written.
+
+        All domains are resolved against a single zone listing, which is loaded once per client, or by parallel
+        probes if `parallel_probes` is set, and every affected rrset is read once, so a missing zone or a token
+        without access to a zone fails before the first record is created. The planned changes can be carried out
+        with `apply` without reading them again.
+
+        :param challenges: Tuples of domain, validation name and validation content.
+        :return: The planned change for each challenge, in the given order.
+        """
+        zones = self._resolve_zones(sorted({domain for domain, _, _ in challenges}))
+        missing = sorted({domain for domain, _, _ in challenges if domain not in zones})
+        if missing:
+            raise StackitError(
+                f"Could not find a zone in project {self.project_id} for: {', '.join(missing)}"
+            )
+
+        changes = []
+        # rrsets already seen in this plan, e.g. a domain and its wildcard share one validation name
+        rrsets: Dict[Tuple[str, str], RRSet] = {}
+        for domain, validation_name, validation in challenges:
+            zone_name, zone_id = zones[domain]
+            key = (zone_id, validation_name.rstrip("."))
+            if key not in rrsets:
+                rrset = self._get_rrset(zone_id, validation_name)
+                rrsets[key] = rrset if rrset is not None else RRSet(id="", records=[])
+
+            rrset = rrsets[key]
+            if validation in [record.content for record in rrset.records]:
+                action = "none"
+            elif rrset.id or rrset.records:
+                action = "add"
+            else:
+                action = "create"
+            rrset.records.append(Record(content=validation, id=""))
+
+            changes.append(
+                PlannedChange(
+                    domain=domain,
+                    validation_name=validation_name,
+                    zone_id=zone_id,
+                    zone_name=zone_name,
+                    action=action,
+                    rrset_id=rrset.id or None,
+                )
+            )
+        return changes
+
+    def _get_rrset(
+        self, zone_id: str, validation_name: str, use_cache: bool = True
+    ) -> Optional[RRSet]:
+        """
+        Retrieve the rrset ID for the given zone ID and validation name.
+
+        :param zone_id: The zone ID where the rrset is located.
+        :param validation_name: The name of the rrset to retrieve.
+        :param use_cache: Whether a cached response may be used.
+        :return: The rrset object if found; otherwise, None.
+        """
+        if not validation_name.endswith("."):
+            validation_name = f"{validation_name}."
+
+        res = self._get(
+            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets?name[eq]={validation_name}&type[eq]=TXT&active[eq]=true",
+            use_cache=use_cache,
+        )
+        if res.status_code != 200:
+            raise StackitError(
+                f"Could not find rrset id for zone id {zone_id} and validation name {validation_name}, Response: {res.text}"
+            )
+
+        if len(res.json()["rrSets"]) == 0:
+            return None
+
+        records = []
+        for record in res.json()["rrSets"][0]["records"]:
+            records.append(Record(content=record["content"], id=record["id"]))
+
+        rrset = RRSet(
+            id=res.json()["rrSets"][0]["id"],
+            records=records,
+            state=res.json()["rrSets"][0].get("state"),
+        )
+
+        return rrset
+
+    def records_settled(self, zone_id: str, validation_names: List[str]) -> bool:
+        """
+        Check whether the API reports the given rrsets as successfully applied.
+
+        :param zone_id: The zone ID where the rrsets are located.
+        :param validation_names: The names of the rrsets to check.
+        :return: True if every rrset exists and its last change succeeded; otherwise, False.
+        """
+        for validation_name in validation_names:
+            # the state changes without a write of ours, so a cached rrset would report a stale pending state
+            rrset = self._get_rrset(zone_id, validation_name, use_cache=False)
+            if rrset is None or not (rrset.state or "").endswith("_SUCCEEDED"):
+                return False
+        return True
+
+    def del_txt_record(self, domain: str, validation_name: str, validation: str):
+        """
+        Delete a TXT record using the supplied information.
+
+        :param domain: The zone dnsName.
+        :param validation_name: The record name.
+        :param validation: The record content.
+        """
+        zone_id = self._get_zone_id(domain)
+        rrset = self._get_rrset(zone_id, validation_name)
+        # delete rrset only if it exists. If it does not exist, we do not need to delete it
+        if rrset is not None:
+            self._delete_record_set(zone_id, rrset.id)
+
+    def _delete_record_set(self, zone_id: str, rrset_id: str):
+        """
+        Delete the rrset using the supplied zone ID and rrset ID.
+
+        :param zone_id: The zone ID where the rrset is located.
+        :param rrset_id: The ID of the rrset to be deleted.
+        """
+        res = self._request(
+            "delete",
+            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets/{rrset_id}",
+        )
+
+        if res.status_code != 202:
+            raise StackitError(
+                f"Could not delete rrset id {rrset_id}. Response: {res.text}"
+            )
+
+
+@dataclass
+class _DrainResult:
+    """
+    Represents the outcome of draining a cleanup queue.
+
+    Attributes:
+        deleted (int): The number of records that were deleted.
+        failed (int): The number of records whose delete failed.
+        skipped (int): The number of records left for a client of another project.
+    """
+
+    deleted: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+class _CleanupQueue(object):
+    """
+    A durable local queue of TXT records whose deletion was deferred.
+
+    Entries are stored as JSON lines, so a queue survives the process that filled it and is drained by a later run.
+    An entry only leaves the queue once its record was deleted or it ran out of attempts, so a drain that is
+    interrupted loses nothing. All access is serialized through a lock file next to the queue, as the queue file
+    itself is replaced when entries are removed.
+
+    Attributes:
+        path (str): The path of the queue file.
+        max_workers (int): The maximum number of deletes running at the same time while draining.
+        max_attempts (int): The number of failed deletes after which an entry is dropped.
+    """
+
+    def __init__(self, path: str, max_workers: int = 4, max_attempts: int = 5):
+        """
+        Initialize the CleanupQueue.
+
+        :param path: The path of the queue file.
+        :param max_workers: The maximum number of deletes running at the same time while draining.
+        :param max_attempts: The number of failed deletes after which an entry is dropped.
+        """
+        self.path = path
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the lock of the queue."""
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def push(
+        self, domain: str, validation_name: str, validation: str, attempts: int = 0
+    ):
+        """
+        Append a cleanup intent to the queue.
+
+        :param domain: The domain from which the DNS record will be deleted.
+        :param validation_name: The name of the DNS record to be deleted.
+        :param validation: The validation content of the DNS record to be deleted.
+        :param attempts: The number of deletes of this record that already failed.
+        """
+        entry = {
+            "domain": domain,
+            "validation_name": validation_name,
+            "validation": validation,
+            "attempts": attempts,
+        }
+        with self._locked(), open(self.path, "a") as file:
+            file.write(json.dumps(entry) + "\n")
+
+    def _read(self) -> List[dict]:
+        """
+        Read all entries of the queue. Must be called with the lock held.
+
+        Lines that cannot be parsed are logged and skipped, so one damaged entry does not lose the rest of the queue.
+
+        :return: The queued entries, in the order they were queued.
+        """
+        try:
+            with open(self.path, "r") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                parsed = json.loads(line)
+                entries.append({field: parsed[field] for field in _QUEUE_FIELDS})
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(
+                    f"Skipping damaged entry of cleanup queue {self.path}: {e}"
+                )
+        return entries
+
+    def _write(self, entries: List[dict]):
+        """
+        Replace the queue with the given entries atomically. Must be called with the lock held.
+
+        :param entries: The entries to keep.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as file:
+            file.writelines(json.dumps(entry) + "\n" for entry in entries)
+        os.replace(tmp_path, self.path)
+
+    def entries(self) -> List[dict]:
+        """
+        Return the queued entries without removing them.
+
+        :return: The queued entries, in the order they were queued.
+        """
+        with self._locked():
+            return self._read()
+
+    def drain(
+        self,
+        get_client: Callable[[str], _StackitClient],
+        skip_foreign_zones: bool = False,
+    ) -> _DrainResult:
+        """
+        Delete all queued records, keeping the ones that fail in the queue.
+
+        The deletes run without holding the lock. Afterwards, the drained entries are removed or have their attempts
+        counted, while entries queued in the meantime are kept as they are.
+
+        :param get_client: Returns the client used to delete the records of a domain.
+        :param skip_foreign_zones: Whether records without a zone in the project of their client are left in the
+            queue without counting an attempt, e.g. because a drain with the credentials of another project
+            handles them.
+        :return: The number of deleted, failed and skipped records.
+        """
+        snapshot = self.entries()
+        # a delete removes the whole rrset, so one delete per record name is enough
+        unique: Dict[Tuple[str, str], dict] = {}
+        for entry in snapshot:
+            unique.setdefault((entry["domain"], entry["validation_name"]), entry)
+        if not unique:
+            return _DrainResult()
+
+        def delete(entry: dict) -> str:
+            try:
+                get_client(entry["domain"]).del_txt_record(
+                    entry["domain"], entry["validation_name"], entry["validation"]
+                )
+                return "deleted"
+            except _ZoneNotFoundError as e:
+                if skip_foreign_zones:
+                    logger.debug(f"Leaving {entry['validation_name']} queued: {e}")
+                    return "skipped"
+                logger.warning(
+                    f"Deferred cleanup of {entry['validation_name']} failed: {e}"
+                )
+                return "failed"
+            except StackitError as e:
+                logger.warning(
+                    f"Deferred cleanup of {entry['validation_name']} failed: {e}"
+                )
+                return "failed"
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(zip(unique, executor.map(delete, unique.values())))
+
+        with self._locked():
+            drained = collections.Counter(json.dumps(entry) for entry in snapshot)
+            remaining = []
+            for entry in self._read():
+                key = json.dumps(entry)
+                if not drained[key]:
+                    remaining.append(entry)
+                    continue
+                drained[key] -= 1
+                outcome = results[(entry["domain"], entry["validation_name"])]
+                if outcome == "deleted":
+                    continue
+                if outcome == "skipped":
+                    remaining.append(entry)
+                    continue
+                entry["attempts"] += 1
+                if entry["attempts"] >= self.max_attempts:
+                    logger.warning(
+                        f"Giving up on deferred cleanup of {entry['validation_name']} after "
+                        f"{entry['attempts']} attempts"
+                    )
+                    continue
+                remaining.append(entry)
+            self._write(remaining)
+
+        outcomes = list(results.values())
+        return _DrainResult(
+            deleted=outcomes.count("deleted"),
+            failed=outcomes.count("failed"),
+            skipped=outcomes.count("skipped"),
+        )
+
+
+class _TokenCache(object):
+    """
+    A local file caching access tokens across processes until shortly before they expire.
+
+    Attributes:
+        path (str): The path of the JSON file holding the tokens.
+        margin (int): The number of seconds before its expiry from which a token is no longer used.
+    """
+
+    def __init__(self, path: str, margin: int = 60):
+        """
+        Initialize the TokenCache.
+
+        :param path: The path of the JSON file holding the tokens.
+        :param margin: The number of seconds before its expiry from which a token is no longer used.
+        """
+        self.path = path
+        self.margin = margin
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Load all cached tokens.
+
+        :return: The tokens and their expiry, keyed by service account file path.
+        """
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return a cached token that is not about to expire.
+
+        :param key: The service account file path the token was obtained for.
+        :return: The token if cached and still valid; otherwise, None.
+        """
+        entry = self._load().get(key)
+        if entry is None or entry["expires_at"] - self.margin <= time.time():
+            return None
+        return entry["token"]
+
+    def put(self, key: str, token: str):
+        """
+        Store a token, readable by the current user only.
+
+        :param key: The service account file path the token was obtained for.
+        :param token: The access token, a JWT carrying its expiry.
+        """
+        try:
+            # the expiry is read without verifying the signature, the token is only stored, not trusted
+            payload = token.split(".")[1]
+            expires_at = json.loads(
+                base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+            )["exp"]
+        except (IndexError, ValueError, KeyError, TypeError):
+            return
+
+        tokens = self._load()
+        tokens[key] = {"token": token, "expires_at": expires_at}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as file:
+            json.dump(tokens, file)
+        os.replace(tmp_path, self.path)
+
+
+class _ServiceAccountAuth(object):
+    """
+    Obtains access tokens for STACKIT service accounts.
+
+    Shared by the certbot authenticator and the standalone hooks. Subclasses set `_token_circuit_breaker`, may set
+    another `_transport` and provide the token cache through `_get_token_cache`.
+    """
+
+    _token_circuit_breaker: "_CircuitBreaker"
+    _transport: _Transport = _RequestsTransport()
+
+    def _get_token_cache(self) -> Optional[_TokenCache]:
+        """
+        Return the cache for access tokens.
+
+        :return: The token cache, or None to always request new tokens.
+        """
+        return None
+
+    def _get_access_token(self, file_path: str) -> str:
+        """
+        Return an access token for a service account, from the token cache if possible.
+
+        :param file_path: The path to the service account file.
+        :return: An access token.
+        """
+        token_cache = self._get_token_cache()
+        if token_cache is not None:
+            token = token_cache.get(os.path.abspath(file_path))
+            if token is not None:
+                return token
+        return self._renew_access_token(file_path)
+
+    def _renew_access_token(self, file_path: str) -> str:
+        """
+        Request a new access token for a service account and store it in the token cache.
+
+        :param file_path: The path to the service account file.
+        :return: An access token.
+        """
+        token = self._generate_jwt_token(file_path)
+        token_cache = self._get_token_cache()
+        if token_cache is not None:
+            token_cache.put(os.path.abspath(file_path), token)
+        return token
+
+    def _create_token_pool(self, service_accounts: str) -> _TokenPool:
+        """
+        Obtain an access token for each of several service accounts of the same project.
+
+        :param service_accounts: Comma separated paths to the service account files.
+        :return: A token pool holding one renewable token per service account.
+        """
+        tokens = []
+        for file_path in service_accounts.split(","):
+            file_path = file_path.strip()
+            if file_path:
+                tokens.append(
+                    _PooledToken(
+                        self._get_access_token(file_path),
+                        refresh=functools.partial(self._renew_access_token, file_path),
+                    )
+                )
+        if not tokens:
+            raise StackitError("No service account file given.")
+        return _TokenPool(tokens)
+
+    def _load_service_file(self, file_path: str) -> Optional[ServiceFileCredentials]:
+        """
+        Load service file credentials from a specified file path.
+
+        :param file_path: The path to the service account file.
+        :return: Service file credentials if the file is found and valid, None otherwise.
+        """
+        try:
+            with open(file_path, "r") as file:
+                return json.load(file)["credentials"]
+        except FileNotFoundError:
+            logging.error(f"File not found: {file_path}")
+            return None
+
+    def _generate_jwt(self, credentials: ServiceFileCredentials) -> str:
+        """
+        Generate a JWT token using the provided service file credentials.
+
+        :param credentials: The service file credentials.
+        :return: A JWT token as a string.
+        """
+        # imported here, so hooks answered from the token cache do not pay for loading the crypto backend
+        import uuid
+
+        import jwt
+
+        payload = {
+            "iss": credentials["iss"],
+            "sub": credentials["sub"],
+            "aud": credentials["aud"],
+            "exp": int(time.time()) + 900,
+            "iat": int(time.time()),
+            "jti": str(uuid.uuid4()),
+        }
+        headers = {"kid": credentials["kid"]}
+        return jwt.encode(
+            payload,
+            credentials["privateKey"],
+            algorithm="RS512",
+            headers=headers,  # nosemgrep "privateKey" is just the key for the dictionary
+        )
+
+    def _request_access_token(self, jwt_token: str) -> str:
+        """
+        Request an access token using a JWT token.
+
+        :param jwt_token: The JWT token used to request the access token.
+        :return: An access token if the request is successful, None otherwise.
+        """
+        data = {
+            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+            "assertion": jwt_token,
+        }
+        self._token_circuit_breaker.before()
+        try:
+            response = self._transport.request(
+                "post",
+                _TOKEN_URL,
+                data=data,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=_TIMEOUT,
+            )
+        except _TransportError as e:
+            self._token_circuit_breaker.failure()
+            raise StackitError(f"Failed to request access token: {e}")
+        # only server errors indicate a degraded endpoint, a rejected assertion does not
+        if response.status_code >= 500:
+            self._token_circuit_breaker.failure()
+        else:
+            self._token_circuit_breaker.success()
+        if response.status_code >= 400:
+            raise StackitError(
+                f"Failed to request access token: {response.status_code} response from {_TOKEN_URL}"
+            )
+        return response.json().get("access_token")
+
+    def _generate_jwt_token(self, file_path: str) -> str:
+        """
+        Generate a JWT token and request an access token using the service file at the given path.
+
+        :param file_path: The path to the service account file.
+        :return: An access token.
+        """
+        credentials = self._load_service_file(file_path)
+        if credentials is None:
+            raise StackitError("Failed to load service file credentials.")
+        jwt_token = self._generate_jwt(credentials)
+        bearer = self._request_access_token(jwt_token)
+        if bearer is None:
+            raise StackitError("Could not obtain access token.")
+        return bearer
+
+
+class _StandaloneAuth(_ServiceAccountAuth):
+    """
+    Obtains access tokens for service accounts outside of certbot.
+
+    Attributes:
+        token_cache (_TokenCache): The cache sharing access tokens across invocations, if any.
+    """
+
+    def __init__(
+        self, token_cache: Optional[_TokenCache], transport: Optional[_Transport] = None
+    ):
+        """
+        Initialize the StandaloneAuth.
+
+        :param token_cache: The cache sharing access tokens across invocations, if any.
+        :param transport: Sends the token requests, defaults to `requests`.
+        """
+        self.token_cache = token_cache
+        self._token_circuit_breaker = _circuit_breaker(_TOKEN_URL)
+        if transport is not None:
+            self._transport = transport
+
+    def _get_token_cache(self) -> Optional[_TokenCache]:
+        """
+        Return the cache for access tokens.
+
+        :return: The token cache, or None to always request new tokens.
+        """
+        return self.token_cache
+
+
+def create_client(
+    project_id: str,
+    auth_token: Optional[str] = None,
+    service_account: Optional[str] = None,
+    base_url: Optional[str] = None,
+    token_cache: Optional[str] = None,
+    transport: Optional[_Transport] = None,
+) -> _StackitClient:
+    """
+    Create a client for the STACKIT DNS API outside of certbot.
+
+    A service account takes precedence over an authentication token.
+
+    :param project_id: The ID of the STACKIT project holding the zones.
+    :param auth_token: The authentication token for the API, if no service account is used.
+    :param service_account: Comma separated paths to service account files of the project.
+    :param base_url: The base URL endpoint for the STACKIT API, if not the default one.
+    :param token_cache: The file sharing access tokens of service accounts across processes, if any.
+    :param transport: Sends the HTTP requests, defaults to `requests`.
+    :return: The client.
+    :raises StackitError: If neither a service account nor an authentication token is given.
+    """
+    base_url = base_url or _BASE_URL
+    if service_account:
+        cache = _TokenCache(token_cache) if token_cache else None
+        auth = _StandaloneAuth(cache, transport)
+        token_pool = auth._create_token_pool(service_account)
+        return _StackitClient(
+            token_pool.tokens[0].token,
+            project_id,
+            base_url,
+            token_pool=token_pool,
+            transport=transport,
+        )
+
+    if not auth_token:
+        raise StackitError("Either a service account or an auth token is required.")
+    return _StackitClient(auth_token, project_id, base_url, transport=transport)
@@ -0,0 +1,274 @@
+"""
+Standalone hooks publishing and removing dns-01 TXT records without starting certbot.
+
+The hooks are meant for ACME clients like acme.sh or lego, or for certbot's `--manual-auth-hook` and
+`--manual-cleanup-hook`. They load neither certbot nor click, and send their requests with the standard library
+instead of `requests`, so they start considerably faster than certbot. They share their access tokens across
+invocations through a local token cache.
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from .client import (
+    _BASE_URL,
+    _CleanupQueue,
+    _StackitClient,
+    _UrllibTransport,
+    create_client,
+    StackitError,
+)
+
+_ACME_CHALLENGE_PREFIX = "_acme-challenge."
+
+_CREDENTIALS_PREFIX = "dns_stackit_"
+
+
+def _default_token_cache() -> str:
+    """
+    Return the default path of the token cache.
+
+    :return: The path below `$XDG_CACHE_HOME`, or below `~/.cache` if that is not set.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "certbot-dns-stackit", "tokens.json")
+
+
+def _parser(prog: str, description: str) -> argparse.ArgumentParser:
+    """
+    Create the argument parser shared by both hooks.
+
+    :param prog: The name of the command.
+    :param description: The description shown in the help of the command.
+    :return: The argument parser.
+    """
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    parser.add_argument(
+        "name",
+        nargs="?",
+        help="The validation name, e.g. _acme-challenge.example.com.",
+    )
+    parser.add_argument("value", nargs="?", help="The validation content.")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read whitespace separated name and value pairs from stdin, one per line.",
+    )
+    parser.add_argument(
+        "--service-account",
+        default=os.environ.get("STACKIT_SERVICE_ACCOUNT"),
+        help="Comma separated paths to service account files (env: STACKIT_SERVICE_ACCOUNT).",
+    )
+    parser.add_argument(
+        "--project-id",
+        default=os.environ.get("STACKIT_PROJECT_ID"),
+        help="The ID of the STACKIT project (env: STACKIT_PROJECT_ID).",
+    )
+    parser.add_argument(
+        "--auth-token",
+        default=os.environ.get("STACKIT_AUTH_TOKEN"),
+        help="The authentication token for the STACKIT DNS API (env: STACKIT_AUTH_TOKEN).",
+    )
+    parser.add_argument(
+        "--credentials",
+        default=os.environ.get("STACKIT_CREDENTIALS"),
+        help="The certbot credentials INI file of the plugin (env: STACKIT_CREDENTIALS).",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=os.environ.get("STACKIT_BASE_URL"),
+        help=f"The base URL of the STACKIT DNS API (env: STACKIT_BASE_URL, default: {_BASE_URL}).",
+    )
+    parser.add_argument(
+        "--token-cache",
+        default=_default_token_cache(),
+        help="The file sharing access tokens across invocations. An empty value disables it.",
+    )
+    return parser
+
+
+def _load_credentials(file_path: str) -> Dict[str, str]:
+    """
+    Load the `dns_stackit_*` settings of a certbot credentials file.
+
+    The file is parsed by hand, as configobj would pull in certbot's configuration stack.
+
+    :param file_path: The path to the credentials file.
+    :return: The settings without their `dns_stackit_` prefix.
+    :raises StackitError: If the file cannot be read.
+    """
+    try:
+        with open(file_path, "r") as file:
+            lines = file.readlines()
+    except OSError as e:
+        raise StackitError(f"Could not read credentials file {file_path}: {e}")
+
+    settings = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = (part.strip() for part in line.split("=", 1))
+        if key.startswith(_CREDENTIALS_PREFIX):
+            name = key.replace(_CREDENTIALS_PREFIX, "", 1)
+            settings[name] = value.strip("\"'")
+    return settings
+
+
+def _create_client(args: argparse.Namespace) -> _StackitClient:
+    """
+    Create a STACKIT client from the command line arguments.
+
+    Arguments take precedence over the credentials file. A service account takes precedence over an
+    authentication token.
+
+    :param args: The parsed command line arguments.
+    :return: The client.
+    :raises StackitError: If the project ID or any means of authentication is missing.
+    """
+    settings = _load_credentials(args.credentials) if args.credentials else {}
+    project_id = args.project_id or settings.get("project_id")
+    if not project_id:
+        raise StackitError("No project ID given.")
+
+    return create_client(
+        project_id,
+        auth_token=args.auth_token or settings.get("auth_token"),
+        service_account=args.service_account,
+        base_url=args.base_url or settings.get("base_url"),
+        token_cache=args.token_cache,
+        transport=_UrllibTransport(),
+    )
+
+
+def _read_records(args: argparse.Namespace) -> List[Tuple[str, str]]:
+    """
+    Collect the records to publish or remove.
+
+    :param args: The parsed command line arguments.
+    :return: Tuples of validation name and validation content.
+    :raises StackitError: If neither a record nor `--batch` is given.
+    """
+    if args.batch:
+        records = []
+        for line in sys.stdin:
+            parts = line.split()
+            if len(parts) == 2:
+                records.append((parts[0], parts[1]))
+            elif parts:
+                raise StackitError(f"Expected a name and a value, got: {line.strip()}")
+        return records
+
+    if not args.name or not args.value:
+        raise StackitError("Expected a name and a value, or --batch.")
+    return [(args.name, args.value)]
+
+
+def _domain(validation_name: str) -> str:
+    """
+    Derive the domain a validation name belongs to.
+
+    :param validation_name: The validation name, e.g. _acme-challenge.example.com.
+    :return: The domain, e.g. example.com.
+    """
+    validation_name = validation_name.rstrip(".")
+    if validation_name.startswith(_ACME_CHALLENGE_PREFIX):
+        return validation_name.replace(_ACME_CHALLENGE_PREFIX, "", 1)
+    return validation_name
+
+
+def _present(client: _StackitClient, records: List[Tuple[str, str]]):
+    """
+    Publish TXT records.
+
+    Several records are planned first, so a missing zone fails before the first record is written. A single
+    record is written right away, as planning would list every zone of the project for it.
+
+    :param client: The client used to publish the records.
+    :param records: Tuples of validation name and validation content.
+    """
+    challenges = [(_domain(name), name, value) for name, value in records]
+    if len(challenges) == 1:
+        client.add_txt_record(*challenges[0])
+        return
+
+    for change, (_, _, value) in zip(client.plan(challenges), challenges):
+        client.apply(change, value)
+
+
+def _cleanup(client: _StackitClient, records: List[Tuple[str, str]]) -> int:
+    """
+    Remove TXT records, continuing past records that cannot be removed.
+
+    :param client: The client used to remove the records.
+    :param records: Tuples of validation name and validation content.
+    :return: The number of records that could not be removed.
+    """
+    failures = 0
+    deleted = set()
+    for name, value in records:
+        # a delete removes the whole rrset, so one delete per record name is enough
+        if name in deleted:
+            continue
+        deleted.add(name)
+        try:
+            client.del_txt_record(_domain(name), name, value)
+        except Exception as e:
+            print(f"Could not delete TXT record {name}: {e}", file=sys.stderr)
+            failures += 1
+    return failures
+
+
+def present(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the `stackit-dns-present` command.
+
+    :param argv: The command line arguments, defaults to those of the process.
+    :return: The exit status.
+    """
+    parser = _parser("stackit-dns-present", "Publish dns-01 TXT records.")
+    args = parser.parse_args(argv)
+    try:
+        _present(_create_client(args), _read_records(args))
+    except StackitError as e:
+        print(f"stackit-dns-present: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cleanup(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the `stackit-dns-cleanup` command.
+
+    :param argv: The command line arguments, defaults to those of the process.
+    :return: The exit status.
+    """
+    parser = _parser("stackit-dns-cleanup", "Remove dns-01 TXT records.")
+    parser.add_argument(
+        "--drain-queue",
+        metavar="QUEUE_FILE",
+        help="Delete the records queued by certbot's --dns-stackit-deferred-cleanup instead, e.g. "
+        "/var/lib/letsencrypt/dns-stackit-cleanup-queue.jsonl. Failed deletes stay queued, records outside "
+        "the given project are left for a drain with its credentials.",
+    )
+    args = parser.parse_args(argv)
+    try:
+        client = _create_client(args)
+        if args.drain_queue:
+            # records of other projects are left for a drain with their credentials
+            result = _CleanupQueue(args.drain_queue).drain(
+                lambda domain: client, skip_foreign_zones=True
+            )
+            if result.failed:
+                print(
+                    f"stackit-dns-cleanup: {result.failed} queued record(s) could not be deleted",
+                    file=sys.stderr,
+                )
+            return 1 if result.failed else 0
+        failures = _cleanup(client, _read_records(args))
+    except StackitError as e:
+        print(f"stackit-dns-cleanup: {e}", file=sys.stderr)
+        return 1
+    return 1 if failures else 0
@@ -0,0 +1,240 @@
+import datetime
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, List, Tuple
+
+import josepy as jose
+from acme import challenges, messages
+from acme.client import ClientV2
+from certbot import errors
+
+from .client import _StackitClient, PlannedChange
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingChallenge:
+    """Represents a dns-01 challenge whose TXT record is published but not yet answered."""
+
+    domain: str
+    validation_name: str
+    validation: str
+    challb: messages.ChallengeBody
+    response: challenges.ChallengeResponse
+
+
+@dataclass
+class RenewalResult:
+    """
+    Represents the outcome of one certificate order of a renewal sweep.
+
+    Attributes:
+        csr_pem (bytes): The CSR the order was created for.
+        order (OrderResource): The finalized order holding the `fullchain_pem`, if the order succeeded.
+        error (Exception): The error that failed the order, if any.
+    """
+
+    csr_pem: bytes
+    order: Optional[messages.OrderResource] = None
+    error: Optional[Exception] = None
+
+
+@dataclass
+class _Order:
+    """Represents an order of a renewal sweep together with its pending challenges."""
+
+    result: RenewalResult
+    order: Optional[messages.OrderResource] = None
+    pending: List[_PendingChallenge] = field(default_factory=list)
+    changes: List[PlannedChange] = field(default_factory=list)
+
+
+def renew_all(
+    acme_client: ClientV2,
+    csrs: List[bytes],
+    get_client: Callable[[str], _StackitClient],
+    propagation_seconds: int = 900,
+    deadline: Optional[datetime.datetime] = None,
+) -> List[RenewalResult]:
+    """
+    Issue certificates for many CSRs while waiting for DNS propagation only once.
+
+    `certbot renew` processes one lineage after another and waits the full propagation delay for each. This
+    function instead creates all orders, publishes every TXT record, waits a single propagation window, answers the
+    challenges of all orders and only then polls the orders for finalization, so the CA validates all of them at
+    the same time. Choosing the due certificates, creating their CSRs and storing the issued certificates is left to
+    the caller.
+
+    Failures are isolated per order: an order whose domains cannot be resolved to a zone or whose records cannot
+    be published gets an error in its result, while the other orders go on. Only records this call published are
+    removed afterwards.
+
+    :param acme_client: The ACME client of the account the certificates are issued for.
+    :param csrs: The PEM encoded CSRs, one per certificate.
+    :param get_client: Returns the client used to publish and delete the TXT records of a domain, e.g. one created
+        by `certbot_dns_stackit.client.create_client` per project.
+    :param propagation_seconds: The number of seconds to wait for DNS to propagate.
+    :param deadline: The point in time until the orders are polled for finalization.
+    :return: The result of each order, in the order of the given CSRs.
+    """
+    account_key = acme_client.net.key
+    orders = []
+    for csr_pem in csrs:
+        order = _Order(result=RenewalResult(csr_pem=csr_pem))
+        orders.append(order)
+        try:
+            order.order = acme_client.new_order(csr_pem)
+            order.pending = _pending_challenges(order.order, account_key)
+        except Exception as e:
+            logger.error(f"Could not create order: {e}")
+            order.result.error = e
+
+    # plan per order, so a domain without a zone only fails its own order
+    for order in orders:
+        if order.order is None or order.result.error is not None or not order.pending:
+            continue
+        try:
+            order.changes = _plan(get_client, _records(order))
+        except Exception as e:
+            logger.error(
+                f"Could not plan the TXT records of order {order.order.uri}: {e}"
+            )
+            order.result.error = e
+
+    written: List[Tuple[str, str, str]] = []
+    try:
+        for order in orders:
+            if order.result.error is not None:
+                continue
+            for record, change in zip(_records(order), order.changes):
+                try:
+                    get_client(record[0]).apply(change, record[2])
+                except Exception as e:
+                    logger.error(f"Could not publish TXT record {record[1]}: {e}")
+                    order.result.error = e
+                    break
+                written.append(record)
+
+        if written:
+            logger.info(
+                f"Waiting {propagation_seconds} seconds for {len(written)} DNS change(s) to propagate"
+            )
+            time.sleep(propagation_seconds)
+
+        # answer every order before polling any, as polling blocks until the order is finalized
+        for order in orders:
+            if order.order is None or order.result.error is not None:
+                continue
+            try:
+                for challenge in order.pending:
+                    acme_client.answer_challenge(challenge.challb, challenge.response)
+            except Exception as e:
+                logger.error(
+                    f"Could not answer the challenges of order {order.order.uri}: {e}"
+                )
+                order.result.error = e
+
+        for order in orders:
+            if order.order is None or order.result.error is not None:
+                continue
+            try:
+                order.result.order = acme_client.poll_and_finalize(
+                    order.order, deadline
+                )
+            except Exception as e:
+                logger.error(f"Could not finalize order {order.order.uri}: {e}")
+                order.result.error = e
+    finally:
+        _cleanup(get_client, written)
+
+    return [order.result for order in orders]
+
+
+def _plan(
+    get_client: Callable[[str], _StackitClient], records: List[Tuple[str, str, str]]
+) -> List[PlannedChange]:
+    """
+    Plan the TXT records of an order, with one plan per client the records are routed to.
+
+    :param get_client: Returns the client used to publish the TXT records of a domain.
+    :param records: Tuples of domain, validation name and validation content.
+    :return: The planned change for each record, in the given order.
+    """
+    groups: Dict[int, Tuple[_StackitClient, List[int]]] = {}
+    for i, (domain, _, _) in enumerate(records):
+        client = get_client(domain)
+        groups.setdefault(id(client), (client, []))[1].append(i)
+    changes: Dict[int, PlannedChange] = {}
+    for client, indices in groups.values():
+        changes.update(zip(indices, client.plan([records[i] for i in indices])))
+    return [changes[i] for i in range(len(records))]
+
+
+def _records(order: _Order) -> List[Tuple[str, str, str]]:
+    """
+    Return the TXT records needed by the pending challenges of an order.
+
+    :param order: The order to return the records for.
+    :return: Tuples of domain, validation name and validation content.
+    """
+    return [
+        (challenge.domain, challenge.validation_name, challenge.validation)
+        for challenge in order.pending
+    ]
+
+
+def _pending_challenges(
+    order: messages.OrderResource, account_key: jose.JWK
+) -> List[_PendingChallenge]:
+    """
+    Collect the dns-01 challenges of all authorizations of an order that are not yet valid.
+
+    :param order: The order to collect the challenges for.
+    :param account_key: The key of the ACME account.
+    :return: The challenges together with their TXT record and response.
+    """
+    pending = []
+    for authz in order.authorizations:
+        if authz.body.status == messages.STATUS_VALID:
+            continue
+
+        domain = authz.body.identifier.value
+        for challb in authz.body.challenges:
+            if isinstance(challb.chall, challenges.DNS01):
+                response, validation = challb.response_and_validation(account_key)
+                pending.append(
+                    _PendingChallenge(
+                        domain=domain,
+                        validation_name=challb.chall.validation_domain_name(domain),
+                        validation=validation,
+                        challb=challb,
+                        response=response,
+                    )
+                )
+                break
+        else:
+            raise errors.PluginError(f"No dns-01 challenge offered for {domain}")
+    return pending
+
+
+def _cleanup(
+    get_client: Callable[[str], _StackitClient], records: List[Tuple[str, str, str]]
+):
+    """
+    Delete the TXT records of a renewal sweep, logging failures instead of raising them.
+
+    :param get_client: Returns the client used to delete the TXT records of a domain.
+    :param records: Tuples of domain, validation name and validation content.
+    """
+    deleted = set()
+    for domain, validation_name, validation in records:
+        # a delete removes the whole rrset, so one delete per record name is enough
+        if validation_name in deleted:
+            continue
+        deleted.add(validation_name)
+        try:
+            get_client(domain).del_txt_record(domain, validation_name, validation)
+        except Exception as e:
+            logger.warning(f"Could not delete TXT record {validation_name}: {e}")
@@ -1,248 +1,151 @@
-import logging
-from dataclasses import dataclass
-from typing import Optional, List, Callable, TypedDict
-import jwt
-import jwt.help
+import configparser
+import functools
 import json
+import logging
+import math
+import os
+import tempfile
 import time
-import uuid
-import requests
+from dataclasses import dataclass
+from typing import Optional, List, Callable, Dict, Tuple
 
+from acme.challenges import ChallengeResponse
 from certbot import errors
+from certbot.achallenges import AnnotatedChallenge
+from certbot.display import util as display_util
 from certbot.plugins import dns_common
 
+from .client import (  # noqa: F401 re-exported for existing imports of this module
+    _CleanupQueue,
+    _circuit_breaker,
+    _CircuitBreaker,
+    _PooledToken,
+    _ResponseCache,
+    _ServiceAccountAuth,
+    _StackitClient,
+    _TokenCache,
+    _TokenPool,
+    _TOKEN_URL,
+    PlannedChange,
+    Record,
+    RRSet,
+    ServiceFileCredentials,
+    StackitError,
+)
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class Record:
-    """Represents a Record."""
+def _plugin_errors(method: Callable) -> Callable:
+    """
+    Convert errors of the STACKIT client into certbot's PluginError.
 
-    content: str
-    id: str
+    The client does not depend on certbot, so the entry points certbot calls translate its errors.
 
+    :param method: The method of the authenticator to wrap.
+    :return: The wrapped method.
+    """
 
-@dataclass
-class RRSet:
-    """Represents a RRSet."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except StackitError as e:
+            raise errors.PluginError(str(e)) from e
 
-    id: str
-    records: List[Record]
+    return wrapper
 
 
-class ServiceFileCredentials(TypedDict):
+@dataclass
+class _Route:
     """
-    Represents the credentials obtained from a service file for authentication.
+    Represents the project and credentials used for all domains below a domain suffix.
 
     Attributes:
-        iss (str): The issuer of the token, typically the email address of the service account.
-        sub (str): The subject of the token, usually the same as `iss` unless acting on behalf of another user.
-        aud (str): The audience for the token, indicating the intended recipient, usually the authentication URL.
-        kid (str): The key ID used for identifying the private key corresponding to the public key.
-        privateKey (str): The private key used to sign the authentication token.
+        suffix (str): The domain suffix the route applies to.
+        project_id (str): The ID of the STACKIT project holding the zones.
+        auth_token (str): The authentication token for the API, if no service account is used.
+        service_account (str): The path to the service account file, if no token is used.
+        base_url (str): The base URL endpoint for the STACKIT API, if not the default one.
     """
 
-    iss: str
-    sub: str
-    aud: str
-    kid: str
-    privateKey: str
+    suffix: str
+    project_id: str
+    auth_token: Optional[str] = None
+    service_account: Optional[str] = None
+    base_url: Optional[str] = None
 
 
-class _StackitClient(object):
+class _PropagationHistory(object):
     """
-    A client to interact with the STACKIT DNS API.
+    A local history of how long record changes took to go live, per zone.
 
     Attributes:
-        auth_token (str): The authentication token for the API.
-        project_id (str): The project ID associated with the domain (zone).
-        base_url (str): The base URL endpoint for the STACKIT API.
-        headers (dict): The headers to be used in API requests.
+        path (str): The path of the JSON file holding the history.
+        size (int): The number of measurements kept per zone.
+        percentile (float): The percentile of the measurements used as delay.
     """
 
-    def __init__(self, auth_token: str, project_id: str, base_url: str):
-        """
-        Initialize the StackitClient.
-
-        :param auth_token: The authentication token for the API.
-        :param project_id: The project ID associated with the domain (zone).
-        :param base_url: The base URL endpoint for the STACKIT API.
-        """
-        self.auth_token = auth_token
-        self.project_id = project_id
-        self.base_url = base_url
-        self.headers = {"Authorization": f"Bearer {self.auth_token}"}
-
-    def add_txt_record(self, domain: str, validation_name: str, validation: str):
+    def __init__(self, path: str, size: int = 20, percentile: float = 0.95):
         """
-        Add a TXT record using the supplied information.
+        Initialize the PropagationHistory.
 
-        :param domain: The domain one level above the validation name.
-        :param validation_name: The acme challenge record name.
-        :param validation: The acme challenge record content.
+        :param path: The path of the JSON file holding the history.
+        :param size: The number of measurements kept per zone.
+        :param percentile: The percentile of the measurements used as delay.
         """
-        zone_id = self._get_zone_id(domain)
-        rrset = self._get_rrset(zone_id, validation_name)
-        # rrset does not exist therefore add it
-        if rrset is None:
-            self._create_rrset(zone_id, validation_name, validation)
-        else:
-            # rrset exists. If it does not contain the validation record, add it
-            records = [record.content for record in rrset.records]
-            if validation not in records:
-                self._add_record_to_rrset(zone_id, rrset.id, validation)
-
-    def _create_rrset(self, zone_id: str, validation_name: str, validation: str):
-        """
-        Create a new rrset for the supplied zone id.
-
-        :param zone_id: The zone ID where the rrset will be created.
-        :param validation_name: The record name.
-        :param validation: The record content.
-        """
-        # append a dot if the validation name does not end with a dot
-        if not validation_name.endswith("."):
-            validation_name = f"{validation_name}."
-
-        body = {
-            "name": validation_name,
-            "type": "TXT",
-            "ttl": 60,
-            "records": [
-                {
-                    "content": validation,
-                }
-            ],
-        }
-
-        res = requests.post(
-            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets",
-            headers=self.headers,
-            json=body,
-        )
-
-        if res.status_code != 202:
-            raise errors.PluginError(
-                f"Could not create rrset for zone id {zone_id}. Response: {res.text}"
-            )
-
-    def _add_record_to_rrset(self, zone_id: str, rrset_id: str, validation: str):
-        """
-        Add a record to an existing rrset.
-
-        :param zone_id: The zone ID where the rrset is located.
-        :param rrset_id: The rrset ID where the record will be added.
-        :param validation: The record content.
-        """
-        body = {
-            "action": "add",
-            "records": [
-                {
-                    "content": validation,
-                }
-            ],
-        }
-
-        res = requests.patch(
-            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets/{rrset_id}/records",
-            headers=self.headers,
-            json=body,
-        )
-
-        if res.status_code != 202:
-            raise errors.PluginError(
-                f"Could not add record to rrset {rrset_id}. Response: {res.text}"
-            )
+        self.path = path
+        self.size = size
+        self.percentile = percentile
 
-    def _get_zone_id(self, domain: str) -> str:
+    def _load(self) -> Dict[str, List[float]]:
         """
-        Retrieve the zone ID for the given domain.
+        Load the measurements of all zones.
 
-        :param domain: The domain (zone dnsName) for which the zone ID is needed.
-        :return: The ID of the zone.
+        :return: The measurements in seconds, keyed by zone ID.
         """
-        parts = domain.split(".")
-
-        # we are searching for the best matching zone. We can do that by iterating over the parts of the domain
-        # from left to right.
-        for i in range(len(parts)):
-            subdomain = ".".join(parts[i:])
-            res = requests.get(
-                f"{self.base_url}/v1/projects/{self.project_id}/zones?dnsName[eq]={subdomain}&active[eq]=true",
-                headers=self.headers,
-            )
-
-            if res.status_code == 200 and len(res.json()["zones"]) > 0:
-                return res.json()["zones"][0]["id"]
-
-        raise errors.PluginError(
-            f"Could not find zone id for domain {domain}, Response: {res.text}"
-        )
-
-    def _get_rrset(self, zone_id: str, validation_name: str) -> Optional[RRSet]:
-        """
-        Retrieve the rrset ID for the given zone ID and validation name.
-
-        :param zone_id: The zone ID where the rrset is located.
-        :param validation_name: The name of the rrset to retrieve.
-        :return: The rrset object if found; otherwise, None.
-        """
-        if not validation_name.endswith("."):
-            validation_name = f"{validation_name}."
-
-        res = requests.get(
-            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets?name[eq]={validation_name}&type[eq]=TXT&active[eq]=true",
-            headers=self.headers,
-        )
-        if res.status_code != 200:
-            raise errors.PluginError(
-                f"Could not find rrset id for zone id {zone_id} and validation name {validation_name}, Response: {res.text}"
-            )
-
-        if len(res.json()["rrSets"]) == 0:
-            return None
-
-        records = []
-        for record in res.json()["rrSets"][0]["records"]:
-            records.append(Record(content=record["content"], id=record["id"]))
-
-        rrset = RRSet(id=res.json()["rrSets"][0]["id"], records=records)
-
-        return rrset
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
 
-    def del_txt_record(self, domain: str, validation_name: str, validation: str):
+    def record(self, zone_id: str, seconds: float):
         """
-        Delete a TXT record using the supplied information.
+        Add a measurement for a zone, dropping the oldest one if the history is full.
 
-        :param domain: The zone dnsName.
-        :param validation_name: The record name.
-        :param validation: The record content.
+        :param zone_id: The zone ID the measurement was taken for.
+        :param seconds: The time from the write until the change was observed live.
         """
-        zone_id = self._get_zone_id(domain)
-        rrset = self._get_rrset(zone_id, validation_name)
-        # delete rrset only if it exists. If it does not exist, we do not need to delete it
-        if rrset is not None:
-            self._delete_record_set(zone_id, rrset.id)
+        history = self._load()
+        samples = history.get(zone_id, []) + [round(seconds, 1)]
+        oldest = max(0, len(samples) - self.size)
+        history[zone_id] = samples[oldest:]
+        # replaced atomically, so an interrupted write cannot truncate the history of all zones
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        with os.fdopen(fd, "w") as file:
+            json.dump(history, file)
+        os.replace(tmp_path, self.path)
 
-    def _delete_record_set(self, zone_id: str, rrset_id: str):
+    def delay(self, zone_id: str, default: int, floor: int, ceiling: int) -> int:
         """
-        Delete the rrset using the supplied zone ID and rrset ID.
+        Compute the propagation delay for a zone from its measurements.
 
-        :param zone_id: The zone ID where the rrset is located.
-        :param rrset_id: The ID of the rrset to be deleted.
+        :param zone_id: The zone ID to compute the delay for.
+        :param default: The delay used while the zone has no measurements.
+        :param floor: The minimum delay.
+        :param ceiling: The maximum delay.
+        :return: The delay in seconds.
         """
-        res = requests.delete(
-            f"{self.base_url}/v1/projects/{self.project_id}/zones/{zone_id}/rrsets/{rrset_id}",
-            headers=self.headers,
-        )
+        samples = sorted(self._load().get(zone_id, []))
+        if not samples:
+            return min(default, ceiling)
 
-        if res.status_code != 202:
-            raise errors.PluginError(
-                f"Could not delete rrset id {rrset_id}. Response: {res.text}"
-            )
+        rank = math.ceil(self.percentile * len(samples)) - 1
+        return int(min(max(math.ceil(samples[rank]), floor), ceiling))
 
 
-class Authenticator(dns_common.DNSAuthenticator):
+class Authenticator(dns_common.DNSAuthenticator, _ServiceAccountAuth):
     """
     STACKIT DNS Authenticator.
 
@@ -260,6 +163,13 @@ class Authenticator(dns_common.DNSAuthenticator):
 
         self.credentials = None
         self.service_account = None
+        self._stackit_clients: Dict[
+            Optional[Tuple[str, Optional[str], Optional[str], Optional[str]]],
+            _StackitClient,
+        ] = {}
+        self._routes: Optional[List[_Route]] = None
+        self._token_circuit_breaker = _circuit_breaker(_TOKEN_URL)
+        self._cleanup_queue: Optional[_CleanupQueue] = None
 
     @classmethod
     def add_parser_arguments(cls, add: Callable, **kwargs):
@@ -272,15 +182,71 @@ class Authenticator(dns_common.DNSAuthenticator):
         super(Authenticator, cls).add_parser_arguments(
             add, default_propagation_seconds=900
         )
-        add("service-account", help="Service account file path")
+        add(
+            "service-account",
+            help="Service account file path. Several comma separated files of the same project spread the "
+            "requests across their tokens.",
+        )
         add("credentials", help="STACKIT credentials INI file.")
         add("project-id", help="STACKIT project ID")
+        add(
+            "hedge-after",
+            type=float,
+            default=None,
+            help="Seconds after which an unanswered read-only request to the DNS API is sent a second time. "
+            "Disabled by default.",
+        )
+        add(
+            "parallel-probes",
+            type=int,
+            default=0,
+            help="The number of domain suffixes probed at the same time when looking up the zone of a domain. "
+            "If set, the zones of all domains are probed instead of listing every zone of the project. "
+            "Probes one suffix after another by default.",
+        )
+        add(
+            "cache-ttl",
+            type=float,
+            default=0,
+            help="Seconds for which read-only DNS API responses without an ETag are reused. Responses with an "
+            "ETag are always revalidated.",
+        )
+        add(
+            "routing",
+            help="INI file mapping domain suffixes to the STACKIT project and credentials used for them.",
+        )
+        add(
+            "deferred-cleanup",
+            action="store_true",
+            default=False,
+            help="Queue the deletion of TXT records instead of waiting for it. The queue is drained at the start "
+            "of the next run.",
+        )
+        add(
+            "adaptive-propagation",
+            action="store_true",
+            default=False,
+            help="Derive the propagation delay from how long earlier changes took to go live in the same zone.",
+        )
+        add(
+            "propagation-floor",
+            type=int,
+            default=60,
+            help="The minimum delay in seconds when the adaptive propagation delay is used.",
+        )
+        add(
+            "propagation-ceiling",
+            type=int,
+            default=None,
+            help="The maximum delay in seconds when the adaptive propagation delay is used. Defaults to "
+            "propagation-seconds.",
+        )
 
     def _setup_credentials(self):
         """Set up and configure the STACKIT credentials based on provided input."""
         if self.conf("service_account") is not None:
             self.service_account = self.conf("service_account")
-        else:
+        elif self.conf("routing") is None or self.conf("credentials") is not None:
             self.credentials = self._configure_credentials(
                 "credentials",
                 "STACKIT credentials for the STACKIT DNS API",
@@ -292,6 +258,166 @@ class Authenticator(dns_common.DNSAuthenticator):
                 },
             )
 
+    @_plugin_errors
+    def perform(self, achalls: List[AnnotatedChallenge]) -> List[ChallengeResponse]:
+        """
+        Plan all DNS updates up front, then carry them out.
+
+        Every domain is resolved to its zone and every zone is checked before the first record is
+        written, so a missing zone or permission fails the run before anything needs to be rolled back.
+
+        :param achalls: The annotated challenges to perform.
+        :return: The challenge responses.
+        """
+        self._setup_credentials()
+        self._drain_cleanup_queue()
+
+        challenges = []
+        for achall in achalls:
+            # older certbot releases only annotate challenges with the domain
+            identifier = getattr(achall, "identifier", None)
+            domain = identifier.value if identifier is not None else achall.domain
+            challenges.append(
+                (
+                    domain,
+                    achall.validation_domain_name(domain),
+                    achall.validation(achall.account_key),
+                )
+            )
+
+        # plan per project, so each project's zones are listed once
+        groups: Dict[int, Tuple[_StackitClient, List[int]]] = {}
+        for i, (domain, _, _) in enumerate(challenges):
+            client = self._get_stackit_client(domain)
+            groups.setdefault(id(client), (client, []))[1].append(i)
+        changes: Dict[int, PlannedChange] = {}
+        for client, indices in groups.values():
+            planned = client.plan([challenges[i] for i in indices])
+            changes.update(zip(indices, planned))
+        plan = [changes[i] for i in range(len(challenges))]
+
+        for change in plan:
+            logger.info(
+                "Planned %s of TXT record %s in zone %s (%s)",
+                change.action,
+                change.validation_name,
+                change.zone_name,
+                change.zone_id,
+            )
+
+        self._attempt_cleanup = True
+
+        responses = []
+        written: Dict[str, Tuple[float, str, List[str]]] = {}
+        for achall, (domain, validation_name, validation), change in zip(
+            achalls, challenges, plan
+        ):
+            # the planned change already knows the zone and rrset, so nothing is looked up again
+            self._get_stackit_client(domain).apply(change, validation)
+            responses.append(achall.response(achall.account_key))
+
+            names = written.get(change.zone_id, (0.0, domain, []))[2]
+            written[change.zone_id] = (
+                time.monotonic(),
+                domain,
+                names + [validation_name],
+            )
+
+        self._wait_for_propagation(written)
+
+        return responses
+
+    def _wait_for_propagation(self, written: Dict[str, Tuple[float, str, List[str]]]):
+        """
+        Wait for the DNS changes to propagate.
+
+        With the adaptive propagation delay, the delay is a high percentile of the earlier measurements of the
+        affected zones. While waiting, the zones are polled until the API reports the changes as applied, and the
+        time this took is recorded for future runs. Zones that are still pending once the delay is over are polled
+        further, up to the ceiling; a zone still pending at the ceiling is recorded with the ceiling, so a zone that
+        became slower raises its delay instead of keeping the old one.
+
+        :param written: The time of the last write, a domain of the zone and the written rrset names, keyed by
+            zone ID.
+        """
+        propagation_seconds = self.conf("propagation-seconds")
+        if not self.conf("adaptive-propagation") or not written:
+            display_util.notify(
+                f"Waiting {propagation_seconds} seconds for DNS changes to propagate"
+            )
+            time.sleep(propagation_seconds)
+            return
+
+        history = _PropagationHistory(
+            os.path.join(self.config.work_dir, "dns-stackit-propagation-history.json")
+        )
+        floor = self.conf("propagation-floor")
+        ceiling = self.conf("propagation-ceiling") or propagation_seconds
+        delay = max(
+            history.delay(zone_id, propagation_seconds, floor, ceiling)
+            for zone_id in written
+        )
+        display_util.notify(
+            f"Waiting {delay} to {ceiling} seconds for DNS changes to propagate (adaptive)"
+        )
+
+        start = time.monotonic()
+        pending = dict(written)
+        # zones whose last check succeeded and reported the change as not yet applied
+        unsettled = set()
+        while pending:
+            for zone_id, (written_at, domain, names) in list(pending.items()):
+                try:
+                    client = self._get_stackit_client(domain)
+                    settled = client.records_settled(zone_id, names)
+                except (errors.PluginError, StackitError) as e:
+                    logger.debug(f"Could not check the rrsets of zone {zone_id}: {e}")
+                    unsettled.discard(zone_id)
+                    continue
+                if settled:
+                    history.record(zone_id, time.monotonic() - written_at)
+                    del pending[zone_id]
+                else:
+                    unsettled.add(zone_id)
+
+            elapsed = time.monotonic() - start
+            # past the delay, only zones known to be pending are waited for, not zones that cannot be checked
+            if (
+                not pending
+                or elapsed >= ceiling
+                or (elapsed >= delay and not unsettled.intersection(pending))
+            ):
+                break
+            time.sleep(min(5, ceiling - elapsed))
+
+        for zone_id, (written_at, _, _) in pending.items():
+            if zone_id in unsettled:
+                logger.warning(
+                    f"The changes to zone {zone_id} were not applied within {ceiling} seconds"
+                )
+                history.record(zone_id, max(ceiling, time.monotonic() - written_at))
+
+        time.sleep(max(0, delay - (time.monotonic() - start)))
+
+    def _drain_cleanup_queue(self):
+        """
+        Delete the records queued by earlier runs, before any new record is written.
+
+        When deferred cleanup is enabled, the queue is also kept for this run's `_cleanup`.
+        """
+        queue = _CleanupQueue(
+            os.path.join(self.config.work_dir, "dns-stackit-cleanup-queue.jsonl")
+        )
+        result = queue.drain(self._get_stackit_client)
+        if result.deleted:
+            logger.info(
+                f"Deleted {result.deleted} TXT record(s) left over by earlier runs"
+            )
+
+        if self.conf("deferred-cleanup"):
+            self._cleanup_queue = queue
+
+    @_plugin_errors
     def _perform(self, domain: str, validation_name: str, validation: str):
         """
         Carry out a DNS update.
@@ -300,8 +426,11 @@ class Authenticator(dns_common.DNSAuthenticator):
         :param validation_name: The name of the DNS record.
         :param validation: The validation content to be added to the DNS record.
         """
-        self._get_stackit_client().add_txt_record(domain, validation_name, validation)
+        self._get_stackit_client(domain).add_txt_record(
+            domain, validation_name, validation
+        )
 
+    @_plugin_errors
     def _cleanup(self, domain: str, validation_name: str, validation: str):
         """
         Remove the previously added DNS record.
@@ -310,99 +439,160 @@ class Authenticator(dns_common.DNSAuthenticator):
         :param validation_name: The name of the DNS record to be deleted.
         :param validation: The validation content of the DNS record to be deleted.
         """
-        self._get_stackit_client().del_txt_record(domain, validation_name, validation)
+        if self._cleanup_queue is not None:
+            self._cleanup_queue.push(domain, validation_name, validation)
+            return
+        self._get_stackit_client(domain).del_txt_record(
+            domain, validation_name, validation
+        )
 
-    def _get_stackit_client(self) -> _StackitClient:
+    def _get_token_cache(self) -> _TokenCache:
         """
-        Instantiate and return a StackitClient object based on the authentication method.
+        Return the cache for access tokens, kept in the certbot work directory.
 
-        :return: A StackitClient object.
+        :return: The token cache.
         """
-        base_url = "https://dns.api.stackit.cloud"
-        if self.credentials and self.credentials.conf("base_url") is not None:
-            base_url = self.credentials.conf("base_url")
-
-        if self.service_account is not None:
-            access_token = self._generate_jwt_token(self.conf("service_account"))
-            if access_token:
-                return _StackitClient(access_token, self.conf("project-id"), base_url)
-        return _StackitClient(
-            self.credentials.conf("auth_token"),
-            self.credentials.conf("project_id"),
-            base_url,
+        return _TokenCache(
+            os.path.join(self.config.work_dir, "dns-stackit-tokens.json")
         )
 
-    def _load_service_file(self, file_path: str) -> Optional[ServiceFileCredentials]:
+    def _get_stackit_client(self, domain: Optional[str] = None) -> _StackitClient:
         """
-        Load service file credentials from a specified file path.
+        Return the StackitClient responsible for a domain, creating it on first use.
 
-        :param file_path: The path to the service account file.
-        :return: Service file credentials if the file is found and valid, None otherwise.
-        """
-        try:
-            with open(file_path, "r") as file:
-                return json.load(file)["credentials"]
-        except FileNotFoundError:
-            logging.error(f"File not found: {file_path}")
-            return None
-
-    def _generate_jwt(self, credentials: ServiceFileCredentials) -> str:
-        """
-        Generate a JWT token using the provided service file credentials.
+        There is one client per project and set of credentials of the routing file and one for the default
+        credentials. Each client is shared by all challenges routed to it, so the zone index and access token are
+        only fetched once.
 
-        :param credentials: The service file credentials.
-        :return: A JWT token as a string.
+        :param domain: The domain the client is needed for. Without a domain, the default client is returned.
+        :return: A StackitClient object.
         """
-        payload = {
-            "iss": credentials["iss"],
-            "sub": credentials["sub"],
-            "aud": credentials["aud"],
-            "exp": int(time.time()) + 900,
-            "iat": int(time.time()),
-            "jti": str(uuid.uuid4()),
-        }
-        headers = {"kid": credentials["kid"]}
-        return jwt.encode(
-            payload,
-            credentials["privateKey"],
-            algorithm="RS512",
-            headers=headers,  # nosemgrep "privateKey" is just the key for the dictionary
+        route = self._find_route(domain) if domain is not None else None
+        # sections of the same project with other credentials or another endpoint need their own client
+        key = (
+            (route.project_id, route.auth_token, route.service_account, route.base_url)
+            if route is not None
+            else None
         )
+        if key not in self._stackit_clients:
+            if (
+                route is None
+                and self.credentials is None
+                and self.service_account is None
+            ):
+                raise errors.PluginError(
+                    f"No route in {self.conf('routing')} matches the domain {domain}"
+                )
+            self._stackit_clients[key] = self._create_stackit_client(route)
+        return self._stackit_clients[key]
+
+    def _find_route(self, domain: str) -> Optional[_Route]:
+        """
+        Find the route with the longest domain suffix that matches the given domain.
+
+        :param domain: Any domain name.
+        :return: The matching route if found; otherwise, None.
+        """
+        if self._routes is None:
+            routing = self.conf("routing")
+            self._routes = self._load_routes(routing) if routing is not None else []
+
+        domain = domain.rstrip(".").lower()
+        best = None
+        for route in self._routes:
+            if domain == route.suffix or domain.endswith(f".{route.suffix}"):
+                if best is None or len(route.suffix) > len(best.suffix):
+                    best = route
+        return best
+
+    def _load_routes(self, file_path: str) -> List[_Route]:
+        """
+        Load the routes from a routing file.
+
+        Every section of the INI file is named after a domain suffix and holds a `project_id` together with either
+        an `auth_token` or comma separated `service_account` file paths, and optionally a `base_url`. As the file
+        may hold tokens, its permissions are checked like those of the credentials file.
+
+        :param file_path: The path to the routing file.
+        :return: The routes of the file.
+        """
+        dns_common.validate_file_permissions(file_path)
+        # tokens may contain "%", so values are taken as they are
+        parser = configparser.ConfigParser(interpolation=None)
+        try:
+            if not parser.read(file_path):
+                raise errors.PluginError(f"Could not read routing file {file_path}")
+        except configparser.Error as e:
+            raise errors.PluginError(f"Could not parse routing file {file_path}: {e}")
+
+        routes = []
+        for suffix in parser.sections():
+            section = parser[suffix]
+            if "project_id" not in section or not (
+                "auth_token" in section or "service_account" in section
+            ):
+                raise errors.PluginError(
+                    f"Route {suffix} in {file_path} needs a project_id and either an auth_token or a service_account"
+                )
+            routes.append(
+                _Route(
+                    suffix=suffix.rstrip(".").lower(),
+                    project_id=section["project_id"],
+                    auth_token=section.get("auth_token"),
+                    service_account=section.get("service_account"),
+                    base_url=section.get("base_url"),
+                )
+            )
+        return routes
 
-    def _request_access_token(self, jwt_token: str) -> str:
+    def _create_stackit_client(self, route: Optional[_Route] = None) -> _StackitClient:
         """
-        Request an access token using a JWT token.
+        Create a StackitClient object based on the authentication method.
 
-        :param jwt_token: The JWT token used to request the access token.
-        :return: An access token if the request is successful, None otherwise.
+        :param route: The route to create the client for. Without a route, the default credentials are used.
+        :return: A StackitClient object.
         """
-        data = {
-            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
-            "assertion": jwt_token,
-        }
-        try:
-            response = requests.post(
-                "https://service-account.api.stackit.cloud/token",
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
+        base_url = "https://dns.api.stackit.cloud"
+        if route is not None:
+            if route.auth_token is not None:
+                access_token = route.auth_token
+                token_pool = None
+            elif route.service_account is not None:
+                token_pool = self._create_token_pool(route.service_account)
+                access_token = token_pool.tokens[0].token
+            else:
+                raise errors.PluginError(
+                    f"Route {route.suffix} needs either an auth_token or a service_account"
+                )
+            return _StackitClient(
+                access_token,
+                route.project_id,
+                route.base_url or base_url,
+                token_pool=token_pool,
+                hedge_after=self.conf("hedge-after"),
+                parallel_probes=self.conf("parallel-probes"),
+                cache_ttl=self.conf("cache-ttl"),
             )
-            response.raise_for_status()
-            return response.json().get("access_token")
-        except requests.exceptions.RequestException as e:
-            raise errors.PluginError(f"Failed to request access token: {e}")
 
-    def _generate_jwt_token(self, file_path: str) -> Optional[str]:
-        """
-        Generate a JWT token and request an access token using the service file at the given path.
+        if self.credentials and self.credentials.conf("base_url") is not None:
+            base_url = self.credentials.conf("base_url")
 
-        :param file_path: The path to the service account file.
-        :return: An access token if the process is successful, None otherwise.
-        """
-        credentials = self._load_service_file(file_path)
-        if credentials is None:
-            raise errors.PluginError("Failed to load service file credentials.")
-        jwt_token = self._generate_jwt(credentials)
-        bearer = self._request_access_token(jwt_token)
-        if bearer is None:
-            raise errors.PluginError("Could not obtain access token.")
-        return bearer
+        if self.service_account is not None:
+            token_pool = self._create_token_pool(self.conf("service_account"))
+            return _StackitClient(
+                token_pool.tokens[0].token,
+                self.conf("project-id"),
+                base_url,
+                token_pool=token_pool,
+                hedge_after=self.conf("hedge-after"),
+                parallel_probes=self.conf("parallel-probes"),
+                cache_ttl=self.conf("cache-ttl"),
+            )
+        return _StackitClient(
+            self.credentials.conf("auth_token"),
+            self.credentials.conf("project_id"),
+            base_url,
+            hedge_after=self.conf("hedge-after"),
+            parallel_probes=self.conf("parallel-probes"),
+            cache_ttl=self.conf("cache-ttl"),
+        )
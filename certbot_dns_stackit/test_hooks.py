@@ -0,0 +1,220 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch, call, ANY
+
+from certbot_dns_stackit import hooks
+from certbot_dns_stackit.client import (
+    _StandaloneAuth,
+    _UrllibTransport,
+    _ZoneNotFoundError,
+)
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        self.environ = patch.dict(os.environ, {}, clear=True)
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+
+    @patch("certbot_dns_stackit.client._StackitClient")
+    def test_present(self, mock_client_class):
+        status = hooks.present(
+            [
+                "_acme-challenge.example.com",
+                "value_a",
+                "--auth-token",
+                "token",
+                "--project-id",
+                "project",
+            ]
+        )
+
+        self.assertEqual(status, 0)
+        mock_client_class.assert_called_once_with(
+            "token", "project", "https://dns.api.stackit.cloud", transport=ANY
+        )
+        self.assertIsInstance(
+            mock_client_class.call_args[1]["transport"], _UrllibTransport
+        )
+        client = mock_client_class.return_value
+        # a single record is not planned, as that would list every zone of the project
+        client.plan.assert_not_called()
+        client.add_txt_record.assert_called_once_with(
+            "example.com", "_acme-challenge.example.com", "value_a"
+        )
+
+    @patch("certbot_dns_stackit.client._StackitClient")
+    def test_present_batch(self, mock_client_class):
+        os.environ.update(STACKIT_AUTH_TOKEN="token", STACKIT_PROJECT_ID="project")
+        stdin = io.StringIO(
+            "_acme-challenge.example.com value_a\n_acme-challenge.example.org value_b\n"
+        )
+
+        mock_client_class.return_value.plan.return_value = ["change_a", "change_b"]
+
+        with patch("sys.stdin", stdin):
+            status = hooks.present(["--batch"])
+
+        self.assertEqual(status, 0)
+        client = mock_client_class.return_value
+        records = [
+            ("example.com", "_acme-challenge.example.com", "value_a"),
+            ("example.org", "_acme-challenge.example.org", "value_b"),
+        ]
+        client.plan.assert_called_once_with(records)
+        self.assertEqual(
+            client.apply.call_args_list,
+            [call("change_a", "value_a"), call("change_b", "value_b")],
+        )
+        client.add_txt_record.assert_not_called()
+
+    @patch("certbot_dns_stackit.client._StackitClient")
+    def test_cleanup_batch(self, mock_client_class):
+        os.environ.update(STACKIT_AUTH_TOKEN="token", STACKIT_PROJECT_ID="project")
+        stdin = io.StringIO(
+            "_acme-challenge.example.com value_a\n"
+            "_acme-challenge.example.com value_b\n"
+            "\n"
+            "_acme-challenge.example.org. value_c\n"
+        )
+        client = mock_client_class.return_value
+        client.del_txt_record.side_effect = [None, Exception("boom")]
+
+        with patch("sys.stdin", stdin), patch("sys.stderr", io.StringIO()) as stderr:
+            status = hooks.cleanup(["--batch"])
+
+        self.assertEqual(status, 1)
+        self.assertIn("_acme-challenge.example.org.", stderr.getvalue())
+        self.assertEqual(
+            client.del_txt_record.call_args_list,
+            [
+                call("example.com", "_acme-challenge.example.com", "value_a"),
+                call("example.org", "_acme-challenge.example.org.", "value_c"),
+            ],
+        )
+
+    @patch("certbot_dns_stackit.client._StackitClient")
+    def test_cleanup_drain_queue(self, mock_client_class):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "queue.jsonl")
+            queue = hooks._CleanupQueue(path)
+            queue.push("example.com", "_acme-challenge.example.com", "value_a")
+
+            status = hooks.cleanup(
+                ["--drain-queue", path, "--auth-token", "token", "--project-id", "p"]
+            )
+
+            self.assertEqual(queue.entries(), [])
+        self.assertEqual(status, 0)
+        mock_client_class.return_value.del_txt_record.assert_called_once_with(
+            "example.com", "_acme-challenge.example.com", "value_a"
+        )
+
+    @patch("certbot_dns_stackit.client._StackitClient")
+    def test_cleanup_drain_queue_of_several_projects(self, mock_client_class):
+        mock_client_class.return_value.del_txt_record.side_effect = [
+            _ZoneNotFoundError("no zone"),
+            hooks.StackitError("unavailable"),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "queue.jsonl")
+            queue = hooks._CleanupQueue(path)
+            queue.push("example.com", "_acme-challenge.example.com", "value_a")
+            queue.push("example.org", "_acme-challenge.example.org", "value_b")
+
+            with patch("sys.stderr", io.StringIO()) as stderr:
+                status = hooks.cleanup(
+                    [
+                        "--drain-queue",
+                        path,
+                        "--auth-token",
+                        "token",
+                        "--project-id",
+                        "p",
+                    ]
+                )
+
+            # the record of another project is kept as is, the failed one counts an attempt
+            self.assertEqual(
+                [entry["attempts"] for entry in queue.entries()],
+                [0, 1],
+            )
+        self.assertEqual(status, 1)
+        self.assertIn("1 queued record(s)", stderr.getvalue())
+
+    @patch("certbot_dns_stackit.client._StackitClient")
+    def test_present_with_credentials_file(self, mock_client_class):
+        with tempfile.NamedTemporaryFile("w", suffix=".ini") as file:
+            file.write(
+                "# STACKIT\n"
+                'dns_stackit_auth_token = "token"\n'
+                "dns_stackit_project_id = project\n"
+                "dns_stackit_base_url = https://dns.test\n"
+            )
+            file.flush()
+
+            status = hooks.present(
+                ["_acme-challenge.example.com", "value_a", "--credentials", file.name]
+            )
+
+        self.assertEqual(status, 0)
+        mock_client_class.assert_called_once_with(
+            "token", "project", "https://dns.test", transport=ANY
+        )
+
+    @patch("certbot_dns_stackit.client._StackitClient")
+    @patch.object(_StandaloneAuth, "_generate_jwt_token", return_value="sa_token")
+    def test_present_with_service_account(self, mock_generate, mock_client_class):
+        with tempfile.TemporaryDirectory() as directory:
+            status = hooks.present(
+                [
+                    "_acme-challenge.example.com",
+                    "value_a",
+                    "--service-account",
+                    "sa.json",
+                    "--project-id",
+                    "project",
+                    "--token-cache",
+                    os.path.join(directory, "tokens.json"),
+                ]
+            )
+
+        self.assertEqual(status, 0)
+        mock_generate.assert_called_once_with("sa.json")
+        args, kwargs = mock_client_class.call_args
+        self.assertEqual(args, ("sa_token", "project", "https://dns.api.stackit.cloud"))
+        self.assertEqual(kwargs["token_pool"].tokens[0].token, "sa_token")
+
+    def test_present_without_credentials(self):
+        with patch("sys.stderr", io.StringIO()) as stderr:
+            status = hooks.present(
+                ["_acme-challenge.example.com", "value_a", "--project-id", "project"]
+            )
+
+        self.assertEqual(status, 1)
+        self.assertIn("auth token", stderr.getvalue())
+
+    def test_present_without_record(self):
+        with patch("sys.stderr", io.StringIO()):
+            status = hooks.present(["--auth-token", "token", "--project-id", "p"])
+
+        self.assertEqual(status, 1)
+
+    def test_hooks_do_not_import_certbot(self):
+        code = (
+            "import sys, certbot_dns_stackit.hooks; "
+            "sys.exit(any(m.split('.')[0] in ('certbot', 'click', 'jwt', 'requests') for m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code])
+
+        self.assertEqual(result.returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
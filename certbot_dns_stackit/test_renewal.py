@@ -0,0 +1,181 @@
+import unittest
+from unittest.mock import patch, Mock, call, ANY
+
+from acme import challenges, messages
+from certbot import errors
+from certbot_dns_stackit.renewal import renew_all
+
+
+def make_authz(domain, validation, status=messages.STATUS_PENDING):
+    dns_challb = Mock()
+    dns_challb.chall = Mock(spec=challenges.DNS01)
+    dns_challb.chall.validation_domain_name.return_value = f"_acme-challenge.{domain}"
+    dns_challb.response_and_validation.return_value = (f"response_{domain}", validation)
+    http_challb = Mock()
+    http_challb.chall = Mock(spec=challenges.HTTP01)
+
+    authz = Mock()
+    authz.body.status = status
+    authz.body.identifier.value = domain
+    authz.body.challenges = [http_challb, dns_challb]
+    return authz
+
+
+class TestRenewAll(unittest.TestCase):
+    def setUp(self):
+        self.acme_client = Mock()
+        self.stackit_client = Mock()
+        self.stackit_client.plan.side_effect = lambda records: [
+            f"change_{domain}" for domain, _, _ in records
+        ]
+        self.get_client = Mock(return_value=self.stackit_client)
+
+    @patch("time.sleep")
+    def test_renew_all_waits_once(self, mock_sleep):
+        self.acme_client.new_order.side_effect = [
+            Mock(authorizations=[make_authz("a.example.com", "v1")]),
+            Mock(
+                authorizations=[
+                    make_authz("b.example.com", "v2"),
+                    make_authz("c.example.com", "v3", status=messages.STATUS_VALID),
+                ]
+            ),
+        ]
+        self.acme_client.poll_and_finalize.side_effect = ["order_a", "order_b"]
+
+        results = renew_all(self.acme_client, [b"csr_a", b"csr_b"], self.get_client, 60)
+
+        self.assertEqual(
+            self.stackit_client.plan.call_args_list,
+            [
+                call([("a.example.com", "_acme-challenge.a.example.com", "v1")]),
+                call([("b.example.com", "_acme-challenge.b.example.com", "v2")]),
+            ],
+        )
+        self.assertEqual(
+            self.stackit_client.apply.call_args_list,
+            [call("change_a.example.com", "v1"), call("change_b.example.com", "v2")],
+        )
+        mock_sleep.assert_called_once_with(60)
+        # every order is answered before the first one is polled
+        self.assertEqual(
+            [name for name, _, _ in self.acme_client.mock_calls],
+            [
+                "new_order",
+                "new_order",
+                "answer_challenge",
+                "answer_challenge",
+                "poll_and_finalize",
+                "poll_and_finalize",
+            ],
+        )
+        self.assertEqual(self.stackit_client.del_txt_record.call_count, 2)
+        self.assertEqual([result.order for result in results], ["order_a", "order_b"])
+        self.assertEqual([result.error for result in results], [None, None])
+
+    @patch("time.sleep")
+    def test_renew_all_isolates_failed_orders(self, mock_sleep):
+        error = errors.Error("validation failed")
+        self.acme_client.new_order.side_effect = [
+            Mock(authorizations=[make_authz("a.example.com", "v1")]),
+            Mock(authorizations=[make_authz("b.example.com", "v2")]),
+        ]
+        self.acme_client.poll_and_finalize.side_effect = [error, "order_b"]
+
+        results = renew_all(self.acme_client, [b"csr_a", b"csr_b"], self.get_client, 60)
+
+        self.assertIs(results[0].error, error)
+        self.assertEqual(results[1].order, "order_b")
+        self.assertEqual(self.stackit_client.del_txt_record.call_count, 2)
+
+    @patch("time.sleep")
+    def test_renew_all_plan_failure(self, mock_sleep):
+        self.acme_client.new_order.return_value = Mock(
+            authorizations=[make_authz("a.example.org", "v1")]
+        )
+        self.stackit_client.plan.side_effect = errors.PluginError("no zone")
+
+        results = renew_all(self.acme_client, [b"csr_a"], self.get_client, 60)
+
+        self.assertIs(results[0].error, self.stackit_client.plan.side_effect)
+        self.stackit_client.apply.assert_not_called()
+        self.stackit_client.del_txt_record.assert_not_called()
+        self.acme_client.answer_challenge.assert_not_called()
+        mock_sleep.assert_not_called()
+
+    @patch("time.sleep")
+    def test_renew_all_isolates_failed_writes(self, mock_sleep):
+        error = errors.PluginError("503")
+        self.acme_client.new_order.side_effect = [
+            Mock(authorizations=[make_authz("a.example.org", "v1")]),
+            Mock(
+                authorizations=[
+                    make_authz("b.example.com", "v2"),
+                    make_authz("c.example.com", "v3"),
+                ]
+            ),
+            Mock(authorizations=[make_authz("d.example.com", "v4")]),
+        ]
+        self.stackit_client.plan.side_effect = [
+            errors.PluginError("no zone"),
+            ["change_b", "change_c"],
+            ["change_d"],
+        ]
+        self.stackit_client.apply.side_effect = [None, error, None]
+        self.acme_client.poll_and_finalize.return_value = "order_d"
+
+        results = renew_all(
+            self.acme_client, [b"csr_a", b"csr_b", b"csr_d"], self.get_client, 60
+        )
+
+        self.assertIsInstance(results[0].error, errors.PluginError)
+        self.assertIs(results[1].error, error)
+        self.assertEqual(results[2].order, "order_d")
+        self.acme_client.answer_challenge.assert_called_once_with(
+            ANY, "response_d.example.com"
+        )
+        # only the records that were published are removed
+        self.assertEqual(
+            self.stackit_client.del_txt_record.call_args_list,
+            [
+                call("b.example.com", "_acme-challenge.b.example.com", "v2"),
+                call("d.example.com", "_acme-challenge.d.example.com", "v4"),
+            ],
+        )
+
+    @patch("time.sleep")
+    def test_renew_all_routes_domains_to_their_clients(self, mock_sleep):
+        other_client = Mock()
+        other_client.plan.return_value = ["change_b"]
+        self.get_client.side_effect = lambda domain: (
+            other_client if domain.endswith(".org") else self.stackit_client
+        )
+        self.acme_client.new_order.return_value = Mock(
+            authorizations=[
+                make_authz("a.example.com", "v1"),
+                make_authz("b.example.org", "v2"),
+            ]
+        )
+        self.acme_client.poll_and_finalize.return_value = "order"
+
+        results = renew_all(self.acme_client, [b"csr"], self.get_client, 60)
+
+        self.assertEqual(results[0].order, "order")
+        self.stackit_client.plan.assert_called_once_with(
+            [("a.example.com", "_acme-challenge.a.example.com", "v1")]
+        )
+        other_client.plan.assert_called_once_with(
+            [("b.example.org", "_acme-challenge.b.example.org", "v2")]
+        )
+        self.stackit_client.apply.assert_called_once_with("change_a.example.com", "v1")
+        other_client.apply.assert_called_once_with("change_b", "v2")
+        self.stackit_client.del_txt_record.assert_called_once_with(
+            "a.example.com", "_acme-challenge.a.example.com", "v1"
+        )
+        other_client.del_txt_record.assert_called_once_with(
+            "b.example.org", "_acme-challenge.b.example.org", "v2"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
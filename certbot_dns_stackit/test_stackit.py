@@ -1,18 +1,49 @@
 import unittest
 from unittest.mock import patch, Mock, mock_open
 import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import jwt
 from requests.models import Response
-from requests.exceptions import HTTPError
+from requests.exceptions import ConnectTimeout
 
 from certbot import errors
-from certbot_dns_stackit.stackit import _StackitClient, RRSet, Record, Authenticator
+from certbot_dns_stackit.stackit import (
+    _StackitClient,
+    RRSet,
+    Record,
+    Authenticator,
+    PlannedChange,
+    _CleanupQueue,
+    _PropagationHistory,
+    _Route,
+    _PooledToken,
+    _TokenPool,
+    _CircuitBreaker,
+    _ResponseCache,
+    _TokenCache,
+)
+from certbot_dns_stackit.client import (
+    _circuit_breakers,
+    _DrainResult,
+    _ZoneNotFoundError,
+    _TransportError,
+    _UrllibTransport,
+    StackitError,
+)
 
 
 class TestStackitClient(unittest.TestCase):
     def setUp(self):
+        # circuit breakers are shared per endpoint, so failures must not leak into other tests
+        breakers = patch.dict(_circuit_breakers, clear=True)
+        breakers.start()
+        self.addCleanup(breakers.stop)
         self.client = _StackitClient("test_token", "test_project", "https://test.url")
-        self.mock_response = Mock()
+        self.mock_response = Mock(headers={})
         self.mock_rrset = Mock(
             id="rrset_id_test", records=[Mock(content="existing_validation_test")]
         )
@@ -30,10 +61,42 @@ class TestStackitClient(unittest.TestCase):
         self.mock_response.status_code = 404
 
         with patch("requests.get", return_value=self.mock_response) as mock_get:
-            with self.assertRaises(errors.PluginError):
+            with self.assertRaises(StackitError):
                 self.client._get_zone_id("test_domain")
             mock_get.assert_called_once()
 
+    def zones_response(self, url):
+        response = Mock(status_code=200, headers={})
+        zones = {"example.com": "zone_1", "sub.example.com": "zone_2"}
+        dns_name = url.split("dnsName[eq]=")[1].split("&")[0]
+        response.json.return_value = {
+            "zones": [{"id": zones[dns_name]}] if dns_name in zones else []
+        }
+        return response
+
+    def test_get_zone_id_parallel_probes(self):
+        self.client.parallel_probes = 5
+
+        with patch.object(
+            self.client, "_get", side_effect=self.zones_response
+        ) as mock_get:
+            zone_id = self.client._get_zone_id("a.b.sub.example.com")
+
+        self.assertEqual(zone_id, "zone_2")
+        self.assertEqual(mock_get.call_count, 5)
+
+    def test_get_zone_id_parallel_probes_in_batches(self):
+        self.client.parallel_probes = 2
+
+        with patch.object(
+            self.client, "_get", side_effect=self.zones_response
+        ) as mock_get:
+            zone_id = self.client._get_zone_id("a.b.c.d.example.com")
+
+        # a.b.c.d.example.com, b.c.d.example.com, c.d.example.com, d.example.com, then example.com and com
+        self.assertEqual(zone_id, "zone_1")
+        self.assertEqual(mock_get.call_count, 6)
+
     def test_create_rrset(self):
         self.mock_response.status_code = 202
 
@@ -49,7 +112,7 @@ class TestStackitClient(unittest.TestCase):
 
         with patch.object(self.client, "_get_zone_id", return_value="zone_123"):
             with patch("requests.post", return_value=self.mock_response):
-                with self.assertRaises(errors.PluginError) as context:
+                with self.assertRaises(StackitError) as context:
                     self.client._create_rrset(
                         "zone_123", "validation_name_test", "validation_test"
                     )
@@ -73,7 +136,7 @@ class TestStackitClient(unittest.TestCase):
         self.mock_response.text = "Bad Request"
 
         with patch("requests.patch", return_value=self.mock_response):
-            with self.assertRaises(errors.PluginError) as context:
+            with self.assertRaises(StackitError) as context:
                 self.client._add_record_to_rrset(
                     "zone_123", "rrset_id_test", "validation_test"
                 )
@@ -115,12 +178,39 @@ class TestStackitClient(unittest.TestCase):
         self.mock_response.text = "Bad Request"
 
         with patch("requests.get", return_value=self.mock_response):
-            with self.assertRaises(errors.PluginError) as context:
+            with self.assertRaises(StackitError) as context:
                 self.client._get_rrset("zone_123", "validation_name_test")
 
             expected_msg = "Could not find rrset id for zone id zone_123 and validation name validation_name_test., Response: Bad Request"
             self.assertEqual(str(context.exception), expected_msg)
 
+    def test_records_settled(self):
+        settled = RRSet(id="rrset_1", records=[], state="CREATE_SUCCEEDED")
+        pending = RRSet(id="rrset_2", records=[], state="CREATE_PENDING")
+
+        with patch.object(self.client, "_get_rrset", side_effect=[settled, pending]):
+            self.assertFalse(self.client.records_settled("zone_123", ["a", "b"]))
+        with patch.object(self.client, "_get_rrset", side_effect=[settled, None]):
+            self.assertFalse(self.client.records_settled("zone_123", ["a", "b"]))
+        with patch.object(self.client, "_get_rrset", return_value=settled):
+            self.assertTrue(self.client.records_settled("zone_123", ["a", "b"]))
+
+    def test_records_settled_bypasses_cache(self):
+        self.client.response_cache.ttl = 60
+        pending = Mock(status_code=200, headers={})
+        pending.json.return_value = {
+            "rrSets": [{"id": "rrset_1", "records": [], "state": "CREATE_PENDING"}]
+        }
+        settled = Mock(status_code=200, headers={})
+        settled.json.return_value = {
+            "rrSets": [{"id": "rrset_1", "records": [], "state": "CREATE_SUCCEEDED"}]
+        }
+
+        with patch("requests.get", side_effect=[pending, settled]) as mock_get:
+            self.assertFalse(self.client.records_settled("zone_123", ["a"]))
+            self.assertTrue(self.client.records_settled("zone_123", ["a"]))
+            self.assertEqual(mock_get.call_count, 2)
+
     def test_del_txt_record(self):
         self.mock_response.status_code = 202
         with patch.object(
@@ -151,7 +241,7 @@ class TestStackitClient(unittest.TestCase):
         self.mock_response.text = "Bad Request"
 
         with patch("requests.delete", return_value=self.mock_response):
-            with self.assertRaises(errors.PluginError) as context:
+            with self.assertRaises(StackitError) as context:
                 self.client._delete_record_set("zone_123", "rrset_id_test")
 
             self.assertEqual(
@@ -211,9 +301,840 @@ class TestStackitClient(unittest.TestCase):
             with self.assertRaises(AttributeError):
                 self.client._add_record_to_rrset.assert_called_once()
 
+    def test_load_zone_index_paginates(self):
+        first_page = Mock(status_code=200, headers={})
+        first_page.json.return_value = {
+            "zones": [{"id": "zone_1", "dnsName": "example.com"}],
+            "totalPages": 2,
+        }
+        second_page = Mock(status_code=200, headers={})
+        second_page.json.return_value = {
+            "zones": [{"id": "zone_2", "dnsName": "Sub.Example.com."}],
+            "totalPages": 2,
+        }
+
+        with patch("requests.get", side_effect=[first_page, second_page]) as mock_get:
+            index = self.client._load_zone_index()
+
+        self.assertEqual(index, {"example.com": "zone_1", "sub.example.com": "zone_2"})
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_load_zone_index_failure(self):
+        self.mock_response.status_code = 403
+        self.mock_response.text = "Forbidden"
+
+        with patch("requests.get", return_value=self.mock_response):
+            with self.assertRaises(StackitError) as context:
+                self.client._load_zone_index()
+
+        self.assertEqual(
+            str(context.exception),
+            "Could not list zones for project test_project. Response: Forbidden",
+        )
+
+    def test_get_zone_id_uses_zone_index(self):
+        self.client._zone_index = {"example.com": "zone_1", "sub.example.com": "zone_2"}
+
+        with patch("requests.get") as mock_get:
+            self.assertEqual(self.client._get_zone_id("a.sub.example.com"), "zone_2")
+            self.assertEqual(self.client._get_zone_id("other.example.com"), "zone_1")
+            with self.assertRaises(StackitError):
+                self.client._get_zone_id("example.org")
+            mock_get.assert_not_called()
+
+    def test_plan(self):
+        def load_index():
+            self.client._zone_index = {"example.com": "zone_1"}
+
+        existing = RRSet(
+            id="rrset_existing", records=[Record(content="old", id="record_1")]
+        )
+        with patch.object(
+            self.client, "_load_zone_index", side_effect=load_index
+        ), patch.object(
+            self.client, "_get_rrset", side_effect=[None, existing]
+        ) as mock_get_rrset:
+            plan = self.client.plan(
+                [
+                    ("example.com", "_acme-challenge.example.com", "v1"),
+                    ("example.com", "_acme-challenge.example.com", "v2"),
+                    ("www.example.com", "_acme-challenge.www.example.com", "old"),
+                ]
+            )
+
+        self.assertEqual(
+            plan,
+            [
+                PlannedChange(
+                    "example.com",
+                    "_acme-challenge.example.com",
+                    "zone_1",
+                    "example.com",
+                    "create",
+                ),
+                PlannedChange(
+                    "example.com",
+                    "_acme-challenge.example.com",
+                    "zone_1",
+                    "example.com",
+                    "add",
+                ),
+                PlannedChange(
+                    "www.example.com",
+                    "_acme-challenge.www.example.com",
+                    "zone_1",
+                    "example.com",
+                    "none",
+                    "rrset_existing",
+                ),
+            ],
+        )
+        self.assertEqual(mock_get_rrset.call_count, 2)
+
+    def test_plan_loads_zone_index_once(self):
+        def load_index():
+            self.client._zone_index = {"example.com": "zone_1"}
+
+        challenges = [
+            ("example.com", "_acme-challenge.example.com", "v1"),
+            ("www.example.com", "_acme-challenge.www.example.com", "v2"),
+        ]
+        with patch.object(
+            self.client, "_load_zone_index", side_effect=load_index
+        ) as mock_load, patch.object(self.client, "_get_rrset", return_value=None):
+            self.client.plan(challenges)
+            self.client.plan(challenges)
+            self.client.plan(challenges[:1])
+
+        mock_load.assert_called_once()
+
+    def test_plan_single_domain_probes(self):
+        self.mock_response.status_code = 200
+        self.mock_response.json.return_value = {"zones": [{"id": "zone_1"}]}
+
+        with patch(
+            "requests.get", return_value=self.mock_response
+        ) as mock_get, patch.object(
+            self.client, "_get_rrset", return_value=None
+        ), patch.object(
+            self.client, "_load_zone_index"
+        ) as mock_load:
+            plan = self.client.plan(
+                [("Example.com", "_acme-challenge.example.com", "v1")]
+            )
+
+        mock_load.assert_not_called()
+        mock_get.assert_called_once()
+        self.assertEqual(plan[0].zone_name, "example.com")
+        self.assertEqual(plan[0].zone_id, "zone_1")
+
+    def test_plan_parallel_probes_skip_zone_index(self):
+        self.client.parallel_probes = 3
+
+        with patch.object(
+            self.client, "_get", side_effect=self.zones_response
+        ) as mock_get, patch.object(
+            self.client, "_get_rrset", return_value=None
+        ), patch.object(
+            self.client, "_load_zone_index"
+        ) as mock_load:
+            plan = self.client.plan(
+                [
+                    ("example.com", "_acme-challenge.example.com", "v1"),
+                    (
+                        "www.sub.example.com",
+                        "_acme-challenge.www.sub.example.com",
+                        "v2",
+                    ),
+                ]
+            )
+
+        mock_load.assert_not_called()
+        self.assertEqual([change.zone_id for change in plan], ["zone_1", "zone_2"])
+        # example.com and com, then one batch of www.sub.example.com, sub.example.com and example.com
+        self.assertEqual(mock_get.call_count, 5)
+
+    def test_apply(self):
+        create = PlannedChange("a", "_acme-challenge.a", "zone_1", "a", "create")
+        add = PlannedChange("a", "_acme-challenge.a", "zone_1", "a", "add", "rrset_1")
+        add_to_new = PlannedChange("a", "_acme-challenge.a", "zone_1", "a", "add")
+        none = PlannedChange("a", "_acme-challenge.a", "zone_1", "a", "none", "rrset_1")
+
+        with patch.object(self.client, "_create_rrset") as mock_create, patch.object(
+            self.client, "_add_record_to_rrset"
+        ) as mock_add, patch.object(
+            self.client, "_write_txt_record"
+        ) as mock_write, patch.object(
+            self.client, "_get_rrset"
+        ) as mock_get_rrset:
+            for change in (create, add, add_to_new, none):
+                self.client.apply(change, "v1")
+
+        mock_create.assert_called_once_with("zone_1", "_acme-challenge.a", "v1")
+        mock_add.assert_called_once_with("zone_1", "rrset_1", "v1")
+        mock_write.assert_called_once_with("zone_1", "_acme-challenge.a", "v1")
+        mock_get_rrset.assert_not_called()
+
+    def test_plan_missing_zones(self):
+        def load_index():
+            self.client._zone_index = {"example.com": "zone_1"}
+
+        with patch.object(
+            self.client, "_load_zone_index", side_effect=load_index
+        ), patch.object(self.client, "_get_rrset") as mock_get_rrset:
+            with self.assertRaises(StackitError) as context:
+                self.client.plan(
+                    [
+                        ("example.com", "_acme-challenge.example.com", "v1"),
+                        ("b.org", "_acme-challenge.b.org", "v2"),
+                        ("a.org", "_acme-challenge.a.org", "v3"),
+                    ]
+                )
+            mock_get_rrset.assert_not_called()
+
+        self.assertEqual(
+            str(context.exception),
+            "Could not find a zone in project test_project for: a.org, b.org",
+        )
+
+    def test_request_retries_with_other_token(self):
+        pool = _TokenPool([_PooledToken("token_a"), _PooledToken("token_b")])
+        client = _StackitClient("token_a", "test_project", "https://test.url", pool)
+        rate_limited = Mock(status_code=429, headers={})
+        ok = Mock(status_code=200, headers={})
+
+        with patch("requests.get", side_effect=[rate_limited, ok]) as mock_get:
+            self.assertIs(client._request("get", "https://test.url/zones"), ok)
+
+        self.assertEqual(
+            [c[1]["headers"]["Authorization"] for c in mock_get.call_args_list],
+            ["Bearer token_a", "Bearer token_b"],
+        )
+
+    def test_request_gives_up_after_every_token(self):
+        rate_limited = Mock(status_code=429, headers={})
+
+        with patch("requests.get", return_value=rate_limited) as mock_get:
+            self.assertIs(
+                self.client._request("get", "https://test.url/zones"), rate_limited
+            )
+            mock_get.assert_called_once()
+
+    def test_request_timeout_raises_stackit_error(self):
+        with patch("requests.get", side_effect=ConnectTimeout("timed out")) as mock_get:
+            with self.assertRaises(StackitError) as context:
+                self.client._request("get", "https://test.url/zones")
+
+        self.assertEqual(mock_get.call_args[1]["timeout"], (5.0, 30.0))
+        self.assertEqual(
+            str(context.exception),
+            "Request to https://test.url/zones failed: timed out",
+        )
+
+    def test_request_fails_fast_with_open_circuit(self):
+        self.client.circuit_breaker.failure_threshold = 2
+        self.mock_response.status_code = 503
+
+        with patch("requests.get", return_value=self.mock_response) as mock_get:
+            for _ in range(2):
+                self.client._request("get", "https://test.url/zones")
+            with self.assertRaises(StackitError):
+                self.client._request("get", "https://test.url/zones")
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_get_without_hedging(self):
+        with patch.object(
+            self.client, "_request", return_value=self.mock_response
+        ) as mock_request:
+            self.assertIs(
+                self.client._get("https://test.url/zones"), self.mock_response
+            )
+            mock_request.assert_called_once_with("get", "https://test.url/zones")
+
+    def test_get_hedges_slow_request(self):
+        self.client.hedge_after = 0.01
+        self.mock_response.status_code = 200
+        hedged = Mock(status_code=200, headers={})
+
+        def request(method, url):
+            # the first request hangs until the hedged one has been sent
+            if mock_request.call_count == 1:
+                time.sleep(0.2)
+                return self.mock_response
+            return hedged
+
+        with patch.object(self.client, "_request", side_effect=request) as mock_request:
+            self.assertIs(self.client._get("https://test.url/zones"), hedged)
+            self.assertEqual(mock_request.call_count, 2)
+
+    def test_get_hedge_falls_back_on_failure(self):
+        self.client.hedge_after = 0.01
+        self.mock_response.status_code = 200
+
+        def request(method, url):
+            if mock_request.call_count == 1:
+                time.sleep(0.1)
+                return self.mock_response
+            raise StackitError("failed")
+
+        with patch.object(self.client, "_request", side_effect=request) as mock_request:
+            self.assertIs(
+                self.client._get("https://test.url/zones"), self.mock_response
+            )
+
+    def test_get_hedge_error_does_not_beat_success(self):
+        self.client.hedge_after = 0.01
+        self.mock_response.status_code = 200
+
+        def request(method, url):
+            if mock_request.call_count == 1:
+                time.sleep(0.1)
+                return self.mock_response
+            return Mock(status_code=503)
+
+        with patch.object(self.client, "_request", side_effect=request) as mock_request:
+            self.assertIs(
+                self.client._get("https://test.url/zones"), self.mock_response
+            )
+            self.assertEqual(mock_request.call_count, 2)
+
+    def test_get_without_free_hedge_worker(self):
+        self.client.hedge_after = 0.01
+        self.client._hedge_workers_busy = 8
+        self.mock_response.status_code = 200
+
+        with patch.object(
+            self.client, "_request", return_value=self.mock_response
+        ) as mock_request:
+            self.assertIs(
+                self.client._get("https://test.url/zones"), self.mock_response
+            )
+
+        mock_request.assert_called_once_with("get", "https://test.url/zones")
+        self.assertEqual(self.client._hedge_workers_busy, 8)
+
+    def test_take_hedge_respects_budget(self):
+        self.client.hedge_budget = 0.1
+        self.client._gets = 10
+
+        self.assertTrue(self.client._take_hedge())
+        self.assertTrue(self.client._take_hedge())
+        self.assertFalse(self.client._take_hedge())
+
+    def test_hedge_delay_uses_measured_latencies(self):
+        self.client.hedge_after = 0.5
+        self.assertEqual(self.client._hedge_delay(), 0.5)
+
+        self.client._latencies.extend([0.01 * i for i in range(1, 21)])
+        self.assertAlmostEqual(self.client._hedge_delay(), 0.19)
+
+    def test_get_revalidates_etag(self):
+        url = (
+            "https://test.url/v1/projects/test_project/zones/zone_1/rrsets?name[eq]=a."
+        )
+        first = Mock(status_code=200, headers={"ETag": '"v1"'})
+        not_modified = Mock(status_code=304, headers={})
+
+        with patch("requests.get", side_effect=[first, not_modified]) as mock_get:
+            self.assertIs(self.client._get(url), first)
+            self.assertIs(self.client._get(url), first)
+
+        self.assertEqual(mock_get.call_args[1]["headers"]["If-None-Match"], '"v1"')
+
+    def test_get_reuses_response_within_ttl(self):
+        self.client.response_cache.ttl = 60
+        url = "https://test.url/v1/projects/test_project/zones?dnsName[eq]=a"
+        response = Mock(status_code=200, headers={})
+
+        with patch("requests.get", return_value=response) as mock_get:
+            self.assertIs(self.client._get(url), response)
+            self.assertIs(self.client._get(url), response)
+            mock_get.assert_called_once()
+
+    def test_get_without_etag_or_ttl_is_not_cached(self):
+        url = "https://test.url/v1/projects/test_project/zones?dnsName[eq]=a"
+        response = Mock(status_code=200, headers={})
+
+        with patch("requests.get", return_value=response) as mock_get:
+            self.client._get(url)
+            self.client._get(url)
+            self.assertEqual(mock_get.call_count, 2)
+
+    def test_write_invalidates_zone(self):
+        self.client.response_cache.ttl = 60
+        rrset_url = "https://test.url/v1/projects/test_project/zones/zone_123/rrsets?name[eq]=a."
+        zones_url = "https://test.url/v1/projects/test_project/zones?dnsName[eq]=a"
+        response = Mock(status_code=200, headers={})
+        self.mock_response.status_code = 202
+
+        with patch("requests.get", return_value=response) as mock_get, patch(
+            "requests.delete", return_value=self.mock_response
+        ):
+            self.client._get(rrset_url)
+            self.client._get(zones_url)
+            self.client._delete_record_set("zone_123", "rrset_id_test")
+            self.client._get(rrset_url)
+            self.client._get(zones_url)
+
+        self.assertEqual(
+            [c[0][0] for c in mock_get.call_args_list],
+            [rrset_url, zones_url, rrset_url],
+        )
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.breaker = _CircuitBreaker(
+            "https://test.url", failure_threshold=2, reset_seconds=30
+        )
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.breaker.before()
+
+        self.breaker.failure()
+        with self.assertRaises(StackitError) as context:
+            self.breaker.before()
+
+        self.assertEqual(
+            str(context.exception),
+            "https://test.url failed 2 times in a row, failing fast until it recovers",
+        )
+
+    def test_half_open_probe(self):
+        self.breaker.failure()
+        self.breaker.failure()
+
+        with patch("time.monotonic", return_value=time.monotonic() + 31):
+            # a single probe is let through while it is in flight
+            self.breaker.before()
+            with self.assertRaises(StackitError):
+                self.breaker.before()
+
+            # a failed probe opens the circuit again
+            self.breaker.failure()
+            with self.assertRaises(StackitError):
+                self.breaker.before()
+
+        with patch("time.monotonic", return_value=time.monotonic() + 62):
+            self.breaker.before()
+            self.breaker.success()
+            self.breaker.before()
+
+    @patch.dict(_circuit_breakers, clear=True)
+    def test_shared_per_endpoint(self):
+        client_a = _StackitClient("token_a", "project_a", "https://test.url")
+        client_b = _StackitClient("token_b", "project_b", "https://test.url")
+        other = _StackitClient("token_c", "project_c", "https://other.url")
+
+        for _ in range(5):
+            client_a.circuit_breaker.failure()
+
+        # a client of another project fails fast as well, one of another endpoint does not
+        with self.assertRaises(StackitError):
+            client_b.circuit_breaker.before()
+        other.circuit_breaker.before()
+
+
+class TestHedgingAgainstStragglers(unittest.TestCase):
+    def setUp(self):
+        self.client = _StackitClient(
+            "test_token",
+            "test_project",
+            "https://test.url",
+            hedge_after=0.01,
+            hedge_budget=0.25,
+        )
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.stragglers = []
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def request(self, method, url):
+        with self.lock:
+            self.calls += 1
+            straggler = self.calls % 5 == 1
+        if straggler:
+            # every fifth request hangs until the test is over, so only its hedge can answer in time
+            self.stragglers.append(threading.current_thread())
+            self.release.wait(5)
+        return Mock(
+            status_code=200,
+            headers={},
+            json=Mock(return_value={"zones": [{"id": "zone_1"}]}),
+        )
+
+    def test_hedges_answer_for_stragglers(self):
+        with patch.object(self.client, "_request", side_effect=self.request):
+            for _ in range(8):
+                self.assertEqual(self.client._get_zone_id("example.com"), "zone_1")
+
+        self.assertGreaterEqual(len(self.stragglers), 1)
+        self.assertLessEqual(self.client._hedges, 0.25 * self.client._gets + 1)
+        # the stragglers run on daemon threads, so they do not keep the interpreter from exiting
+        self.assertTrue(all(thread.daemon for thread in self.stragglers))
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    """Answers with the request as JSON, using the status given in the path."""
+
+    def do_GET(self):
+        self.answer(int(self.path.strip("/")))
+
+    def do_POST(self):
+        self.answer(int(self.path.strip("/")))
+
+    def answer(self, status):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.dumps(
+            {
+                "method": self.command,
+                "body": self.rfile.read(length).decode(),
+                "content_type": self.headers.get("Content-Type"),
+                "authorization": self.headers.get("Authorization"),
+            }
+        ).encode()
+        self.send_response(status)
+        self.send_header("ETag", '"etag_1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestUrllibTransport(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.transport = _UrllibTransport()
+
+    def test_get(self):
+        res = self.transport.request(
+            "get", f"{self.base_url}/200", headers={"Authorization": "Bearer token"}
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers.get("etag"), '"etag_1"')
+        self.assertEqual(res.json()["authorization"], "Bearer token")
+
+    def test_error_status_is_a_response(self):
+        res = self.transport.request("get", f"{self.base_url}/503")
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()["method"], "GET")
+
+    def test_post_bodies(self):
+        res = self.transport.request("post", f"{self.base_url}/202", json={"a": 1})
+        self.assertEqual(json.loads(res.json()["body"]), {"a": 1})
+        self.assertEqual(res.json()["content_type"], "application/json")
+
+        res = self.transport.request("post", f"{self.base_url}/200", data={"a": "b c"})
+        self.assertEqual(res.json()["body"], "a=b+c")
+
+    def test_connection_failure(self):
+        url = f"{self.base_url}/200"
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertRaises(_TransportError):
+            self.transport.request("get", url, timeout=(1.0, 1.0))
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = _ResponseCache(ttl=60, max_entries=2)
+
+    def test_put_skips_responses_older_than_invalidation(self):
+        generation = self.cache.generation
+        self.cache.invalidate("zone_1")
+
+        self.cache.put("https://test.url/a", Mock(headers={}), generation)
+
+        self.assertIsNone(self.cache.get("https://test.url/a"))
+
+    def test_put_evicts_least_recently_used(self):
+        for url in ["https://test.url/a", "https://test.url/b"]:
+            self.cache.put(url, Mock(headers={}), self.cache.generation)
+        self.cache.get("https://test.url/a")
+
+        self.cache.put("https://test.url/c", Mock(headers={}), self.cache.generation)
+
+        self.assertIsNotNone(self.cache.get("https://test.url/a"))
+        self.assertIsNone(self.cache.get("https://test.url/b"))
+        self.assertIsNotNone(self.cache.get("https://test.url/c"))
+
+    def test_get_expires_entries_without_etag(self):
+        self.cache.put("https://test.url/a", Mock(headers={}), self.cache.generation)
+
+        with patch("time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(self.cache.get("https://test.url/a"))
+
+
+class TestTokenPool(unittest.TestCase):
+    def setUp(self):
+        self.tokens = [_PooledToken("token_a"), _PooledToken("token_b")]
+        self.pool = _TokenPool(self.tokens)
+
+    def test_acquire_spreads_requests(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertIsNot(first, second)
+
+        self.pool.release(first, Mock(status_code=200))
+        self.pool.release(second, Mock(status_code=200))
+        self.assertIs(self.pool.acquire(), first)
+
+    def test_release_sidelines_rate_limited_token(self):
+        token = self.pool.acquire()
+        self.pool.release(token, Mock(status_code=429, headers={"Retry-After": "120"}))
+
+        self.assertGreater(token.sidelined_until, time.monotonic() + 100)
+        for _ in range(3):
+            self.assertIsNot(self.pool.acquire(), token)
+
+    def test_acquire_waits_while_all_tokens_sidelined(self):
+        clock = [100.0]
+        self.tokens[0].sidelined_until = 160.0
+        self.tokens[1].sidelined_until = 130.0
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        with patch("time.monotonic", side_effect=lambda: clock[0]), patch(
+            "time.sleep", side_effect=sleep
+        ) as mock_sleep:
+            self.assertIs(self.pool.acquire(), self.tokens[1])
+
+        mock_sleep.assert_called_once_with(30.0)
+
+    @patch("time.sleep")
+    def test_acquire_fails_when_all_tokens_sidelined_too_long(self, mock_sleep):
+        self.tokens[0].sidelined_until = time.monotonic() + 300
+        self.tokens[1].sidelined_until = time.monotonic() + 120
+
+        with self.assertRaises(StackitError):
+            self.pool.acquire()
+        mock_sleep.assert_not_called()
+
+    def test_release_renews_rejected_token(self):
+        self.tokens[0].refresh = Mock(return_value="token_new")
+        token = self.pool.acquire()
+
+        self.pool.release(token, Mock(status_code=401))
+
+        self.assertEqual(token.token, "token_new")
+        self.assertEqual(token.sidelined_until, 0.0)
+        self.assertEqual(token.in_flight, 0)
+
+    def test_release_renews_concurrently_rejected_token_once(self):
+        token = self.pool.acquire()
+        self.pool.acquire()
+        self.assertIs(self.pool.acquire(), token)
+
+        def refresh():
+            # a second request with the same token is rejected while the renewal runs
+            self.pool.release(token, Mock(status_code=401))
+            return "token_new"
+
+        self.tokens[0].refresh = Mock(side_effect=refresh)
+        self.pool.release(token, Mock(status_code=401))
+
+        self.tokens[0].refresh.assert_called_once()
+        self.assertEqual(self.tokens[0].token, "token_new")
+        self.assertEqual(self.tokens[0].sidelined_until, 0.0)
+        self.assertFalse(self.tokens[0].refreshing)
+
+    def test_release_sidelines_rejected_token_without_refresh(self):
+        token = self.pool.acquire()
+
+        self.pool.release(token, Mock(status_code=401))
+
+        self.assertGreater(token.sidelined_until, time.monotonic())
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = _TokenCache(
+            os.path.join(self.directory.name, "sub", "tokens.json")
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_put_and_get(self):
+        token = jwt.encode({"exp": int(time.time()) + 3600}, "secret")
+
+        self.cache.put("/sa.json", token)
+
+        self.assertEqual(_TokenCache(self.cache.path).get("/sa.json"), token)
+        self.assertEqual(
+            os.stat(os.path.dirname(self.cache.path)).st_mode & 0o777, 0o700
+        )
+
+    def test_get_ignores_expiring_token(self):
+        self.cache.put("/sa.json", jwt.encode({"exp": int(time.time()) + 30}, "secret"))
+
+        self.assertIsNone(self.cache.get("/sa.json"))
+
+    def test_put_skips_token_without_expiry(self):
+        self.cache.put("/sa.json", "opaque")
+
+        self.assertFalse(os.path.exists(self.cache.path))
+
+
+class TestCleanupQueue(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "queue.jsonl")
+        self.queue = _CleanupQueue(self.path, max_attempts=2)
+        self.client = Mock()
+        self.get_client = Mock(return_value=self.client)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_drain_without_queue_file(self):
+        self.assertEqual(self.queue.drain(self.get_client), _DrainResult())
+        self.client.del_txt_record.assert_not_called()
+
+    def test_drain_deletes_each_record_once(self):
+        self.queue.push("example.com", "_acme-challenge.example.com", "v1")
+        self.queue.push("example.com", "_acme-challenge.example.com", "v2")
+        self.queue.push("www.example.com", "_acme-challenge.www.example.com", "v3")
+
+        self.assertEqual(self.queue.drain(self.get_client).deleted, 2)
+        self.assertEqual(self.client.del_txt_record.call_count, 2)
+        self.get_client.assert_any_call("www.example.com")
+        self.assertEqual(self.queue.drain(self.get_client).deleted, 0)
+
+    def test_drain_requeues_failed_deletes(self):
+        self.client.del_txt_record.side_effect = StackitError("unavailable")
+        self.queue.push("example.com", "_acme-challenge.example.com", "v1")
+
+        self.assertEqual(self.queue.drain(self.get_client), _DrainResult(failed=1))
+        with open(self.path) as file:
+            self.assertEqual(json.loads(file.read())["attempts"], 1)
+
+        # the second failure reaches max_attempts and drops the entry
+        self.assertEqual(self.queue.drain(self.get_client), _DrainResult(failed=1))
+        self.assertEqual(self.queue.entries(), [])
+        self.assertEqual(self.client.del_txt_record.call_count, 2)
+
+    def test_drain_interrupted_keeps_entries(self):
+        self.client.del_txt_record.side_effect = KeyboardInterrupt
+        self.queue.push("example.com", "_acme-challenge.example.com", "v1")
+        self.queue.push("example.org", "_acme-challenge.example.org", "v2")
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.queue.drain(self.get_client)
+
+        self.assertEqual(len(self.queue.entries()), 2)
+
+    def test_drain_keeps_entries_queued_meanwhile(self):
+        def delete(domain, validation_name, validation):
+            self.queue.push("example.org", "_acme-challenge.example.org", "v2")
+
+        self.client.del_txt_record.side_effect = delete
+        self.queue.push("example.com", "_acme-challenge.example.com", "v1")
+
+        self.assertEqual(self.queue.drain(self.get_client).deleted, 1)
+        self.assertEqual(
+            [entry["validation"] for entry in self.queue.entries()], ["v2"]
+        )
+
+    def test_drain_skips_foreign_zones(self):
+        self.client.del_txt_record.side_effect = [
+            None,
+            _ZoneNotFoundError("no zone"),
+        ]
+        self.queue.push("example.com", "_acme-challenge.example.com", "v1")
+        self.queue.push("example.org", "_acme-challenge.example.org", "v2")
+
+        result = self.queue.drain(self.get_client, skip_foreign_zones=True)
+
+        self.assertEqual(result, _DrainResult(deleted=1, skipped=1))
+        # the entry is left for another project without counting an attempt
+        self.assertEqual(
+            self.queue.entries(),
+            [
+                {
+                    "domain": "example.org",
+                    "validation_name": "_acme-challenge.example.org",
+                    "validation": "v2",
+                    "attempts": 0,
+                }
+            ],
+        )
+
+    def test_drain_skips_damaged_entries(self):
+        self.queue.push("example.com", "_acme-challenge.example.com", "v1")
+        with open(self.path, "a") as file:
+            file.write('{"domain": "example.org"}\n{"domain": "exam\n')
+        self.queue.push("example.net", "_acme-challenge.example.net", "v2")
+
+        with self.assertLogs("certbot_dns_stackit.client", "WARNING"):
+            self.assertEqual(self.queue.drain(self.get_client).deleted, 2)
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+
+class TestPropagationHistory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = _PropagationHistory(
+            os.path.join(self.directory.name, "history.json"), size=3
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_delay_without_measurements(self):
+        self.assertEqual(self.history.delay("zone_1", 900, 60, 900), 900)
+        self.assertEqual(self.history.delay("zone_1", 900, 60, 300), 300)
+
+    def test_delay_uses_percentile(self):
+        for seconds in [70, 80, 75, 400]:
+            self.history.record("zone_1", seconds)
+
+        # only the last three measurements are kept
+        self.assertEqual(self.history._load()["zone_1"], [80, 75, 400])
+        self.assertEqual(self.history.delay("zone_1", 900, 60, 900), 400)
+        self.assertEqual(self.history.delay("zone_1", 900, 60, 300), 300)
+        self.assertEqual(self.history.delay("zone_2", 900, 60, 900), 900)
+
+    def test_delay_respects_floor(self):
+        self.history.record("zone_1", 4.2)
+
+        self.assertEqual(self.history.delay("zone_1", 900, 60, 900), 60)
+        self.assertEqual(self.history.delay("zone_1", 900, 0, 900), 5)
+
+    def test_interrupted_record_keeps_history(self):
+        self.history.record("zone_1", 70)
+
+        with patch("json.dump", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.history.record("zone_2", 80)
+
+        self.assertEqual(self.history._load(), {"zone_1": [70]})
+
 
 class TestAuthenticator(unittest.TestCase):
     def setUp(self):
+        # circuit breakers are shared per endpoint, so failures must not leak into other tests
+        breakers = patch.dict(_circuit_breakers, clear=True)
+        breakers.start()
+        self.addCleanup(breakers.stop)
         mock_config = Mock()
         mock_name = Mock()
         self.authenticator = Authenticator(mock_config, mock_name)
@@ -267,6 +1188,431 @@ class TestAuthenticator(unittest.TestCase):
             "test_domain", "validation_name_test", "validation_test"
         )
 
+    @patch.object(Authenticator, "_perform")
+    @patch.object(Authenticator, "_get_stackit_client")
+    @patch.object(Authenticator, "_drain_cleanup_queue")
+    @patch.object(Authenticator, "_setup_credentials")
+    def test_perform_plans_before_writing(
+        self,
+        mock_setup_credentials,
+        mock_drain_cleanup_queue,
+        mock_get_client,
+        mock_perform,
+    ):
+        mock_client = Mock()
+        mock_client.plan.side_effect = StackitError("no zone")
+        mock_get_client.return_value = mock_client
+        achall = Mock()
+        achall.identifier.value = "example.com"
+        achall.validation_domain_name.return_value = "_acme-challenge.example.com"
+        achall.validation.return_value = "validation_test"
+
+        with self.assertRaises(errors.PluginError):
+            self.authenticator.perform([achall])
+
+        mock_client.plan.assert_called_once_with(
+            [("example.com", "_acme-challenge.example.com", "validation_test")]
+        )
+        mock_perform.assert_not_called()
+
+    @patch.object(Authenticator, "_get_stackit_client")
+    @patch.object(Authenticator, "_drain_cleanup_queue")
+    @patch.object(Authenticator, "_setup_credentials")
+    def test_perform_without_identifier(
+        self, mock_setup_credentials, mock_drain_cleanup_queue, mock_get_client
+    ):
+        mock_client = Mock()
+        mock_client.plan.side_effect = StackitError("no zone")
+        mock_get_client.return_value = mock_client
+        achall = Mock(
+            spec=["domain", "validation_domain_name", "validation", "account_key"]
+        )
+        achall.domain = "example.com"
+        achall.validation_domain_name.return_value = "_acme-challenge.example.com"
+        achall.validation.return_value = "validation_test"
+
+        with self.assertRaises(errors.PluginError):
+            self.authenticator.perform([achall])
+
+        mock_client.plan.assert_called_once_with(
+            [("example.com", "_acme-challenge.example.com", "validation_test")]
+        )
+
+    @patch.object(Authenticator, "_wait_for_propagation")
+    @patch.object(Authenticator, "_perform")
+    @patch.object(Authenticator, "_get_stackit_client")
+    @patch.object(Authenticator, "_drain_cleanup_queue")
+    @patch.object(Authenticator, "_setup_credentials")
+    def test_perform_writes_planned_changes(
+        self,
+        mock_setup_credentials,
+        mock_drain_cleanup_queue,
+        mock_get_client,
+        mock_perform,
+        mock_wait,
+    ):
+        change = PlannedChange(
+            "example.com",
+            "_acme-challenge.example.com",
+            "zone_1",
+            "example.com",
+            "create",
+        )
+        mock_get_client.return_value.plan.return_value = [change]
+        achall = Mock()
+        achall.identifier.value = "example.com"
+        achall.validation_domain_name.return_value = "_acme-challenge.example.com"
+        achall.validation.return_value = "validation_test"
+
+        responses = self.authenticator.perform([achall])
+
+        self.assertEqual(responses, [achall.response.return_value])
+        mock_get_client.return_value.apply.assert_called_once_with(
+            change, "validation_test"
+        )
+        mock_perform.assert_not_called()
+        written = mock_wait.call_args[0][0]
+        self.assertEqual(list(written), ["zone_1"])
+        self.assertEqual(
+            written["zone_1"][1:], ("example.com", ["_acme-challenge.example.com"])
+        )
+
+    @patch.object(_StackitClient, "apply")
+    @patch.object(_StackitClient, "_get_rrset", return_value=None)
+    @patch.object(Authenticator, "_wait_for_propagation")
+    @patch.object(Authenticator, "_drain_cleanup_queue")
+    @patch.object(Authenticator, "_setup_credentials")
+    @patch.object(Authenticator, "conf")
+    def test_perform_with_parallel_probes(
+        self,
+        mock_conf,
+        mock_setup_credentials,
+        mock_drain_cleanup_queue,
+        mock_wait,
+        mock_get_rrset,
+        mock_apply,
+    ):
+        mock_conf.side_effect = {"parallel-probes": 4, "cache-ttl": 0}.get
+        self.authenticator.credentials = Mock()
+        self.authenticator.credentials.conf.side_effect = {
+            "auth_token": "token",
+            "project_id": "project",
+        }.get
+        achalls = []
+        for domain in ["a.b.example.com", "example.org"]:
+            achall = Mock()
+            achall.identifier.value = domain
+            achall.validation_domain_name.return_value = f"_acme-challenge.{domain}"
+            achall.validation.return_value = "validation_test"
+            achalls.append(achall)
+
+        def zones(url, **kwargs):
+            dns_name = url.split("dnsName[eq]=")[1].split("&")[0]
+            zone_ids = {"example.com": "zone_1", "example.org": "zone_2"}
+            return Mock(
+                status_code=200,
+                headers={},
+                json=Mock(
+                    return_value={
+                        "zones": (
+                            [{"id": zone_ids[dns_name]}] if dns_name in zone_ids else []
+                        )
+                    }
+                ),
+            )
+
+        with patch("requests.get", side_effect=zones) as mock_get:
+            self.authenticator.perform(achalls)
+
+        # the zones are probed in parallel instead of listing every zone of the project
+        probes = sorted(
+            call_args[0][0].split("dnsName[eq]=")[1].split("&")[0]
+            for call_args in mock_get.call_args_list
+        )
+        self.assertEqual(
+            probes,
+            [
+                "a.b.example.com",
+                "b.example.com",
+                "com",
+                "example.com",
+                "example.org",
+                "org",
+            ],
+        )
+        self.assertEqual(
+            [call_args[0][0].zone_id for call_args in mock_apply.call_args_list],
+            ["zone_1", "zone_2"],
+        )
+
+    @patch("certbot.display.util.notify")
+    @patch("time.sleep")
+    @patch.object(Authenticator, "conf")
+    def test_wait_for_propagation_fixed(self, mock_conf, mock_sleep, mock_notify):
+        mock_conf.side_effect = {
+            "propagation-seconds": 900,
+            "adaptive-propagation": False,
+        }.get
+
+        self.authenticator._wait_for_propagation(
+            {"zone_1": (0.0, "example.com", ["name"])}
+        )
+
+        mock_sleep.assert_called_once_with(900)
+
+    @patch("certbot.display.util.notify")
+    @patch("time.sleep")
+    @patch.object(Authenticator, "_get_stackit_client")
+    @patch.object(Authenticator, "conf")
+    def test_wait_for_propagation_adaptive(
+        self, mock_conf, mock_get_client, mock_sleep, mock_notify
+    ):
+        mock_conf.side_effect = {
+            "propagation-seconds": 900,
+            "adaptive-propagation": True,
+            "propagation-floor": 60,
+            "propagation-ceiling": None,
+        }.get
+        mock_get_client.return_value.records_settled.return_value = True
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.authenticator.config.work_dir = directory
+            history = _PropagationHistory(
+                os.path.join(directory, "dns-stackit-propagation-history.json")
+            )
+            history.record("zone_1", 10)
+
+            self.authenticator._wait_for_propagation(
+                {
+                    "zone_1": (
+                        time.monotonic(),
+                        "example.com",
+                        ["_acme-challenge.example.com"],
+                    )
+                }
+            )
+
+            self.assertEqual(len(history._load()["zone_1"]), 2)
+
+        mock_get_client.return_value.records_settled.assert_called_once_with(
+            "zone_1", ["_acme-challenge.example.com"]
+        )
+        # the delay is raised to the floor, of which nothing has been slept yet
+        self.assertAlmostEqual(sum(c[0][0] for c in mock_sleep.call_args_list), 60, 0)
+
+    @patch("certbot.display.util.notify")
+    @patch.object(Authenticator, "_get_stackit_client")
+    @patch.object(Authenticator, "conf")
+    def test_wait_for_propagation_adaptive_zone_slows_down(
+        self, mock_conf, mock_get_client, mock_notify
+    ):
+        mock_conf.side_effect = {
+            "propagation-seconds": 900,
+            "adaptive-propagation": True,
+            "propagation-floor": 60,
+            "propagation-ceiling": 300,
+        }.get
+        clock = [0.0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        # the zone used to settle within 5 seconds, now it takes 120 seconds, then it stops settling at all
+        settle_after = [120]
+        mock_get_client.return_value.records_settled.side_effect = (
+            lambda zone_id, names: clock[0] >= settle_after[0]
+        )
+        written = {"zone_1": (0.0, "example.com", ["_acme-challenge.example.com"])}
+
+        with tempfile.TemporaryDirectory() as directory, patch(
+            "time.monotonic", side_effect=lambda: clock[0]
+        ), patch("time.sleep", side_effect=sleep):
+            self.authenticator.config.work_dir = directory
+            history = _PropagationHistory(
+                os.path.join(directory, "dns-stackit-propagation-history.json")
+            )
+            for _ in range(20):
+                history.record("zone_1", 5)
+
+            self.authenticator._wait_for_propagation(written)
+
+            # waited past the learned delay of 60 seconds until the zone settled
+            self.assertEqual(clock[0], 120)
+            self.assertEqual(history._load()["zone_1"][-1], 120)
+
+            clock[0] = 0.0
+            settle_after[0] = float("inf")
+            with self.assertLogs("certbot_dns_stackit.stackit", "WARNING"):
+                self.authenticator._wait_for_propagation(written)
+
+            # gave up at the ceiling and recorded it; the slow samples raise the next delay above the floor
+            self.assertEqual(clock[0], 300)
+            self.assertEqual(history._load()["zone_1"][-1], 300)
+            self.assertEqual(history.delay("zone_1", 900, 60, 300), 120)
+
+    @patch.object(Authenticator, "_get_stackit_client")
+    def test_cleanup_deferred(self, mock_get_client):
+        self.authenticator._cleanup_queue = Mock()
+
+        self.authenticator._cleanup(
+            "test_domain", "validation_name_test", "validation_test"
+        )
+
+        self.authenticator._cleanup_queue.push.assert_called_once_with(
+            "test_domain", "validation_name_test", "validation_test"
+        )
+        mock_get_client.assert_not_called()
+
+    @patch.object(Authenticator, "conf", return_value=True)
+    @patch.object(Authenticator, "_get_stackit_client")
+    def test_drain_cleanup_queue(self, mock_get_client, mock_conf):
+        with tempfile.TemporaryDirectory() as directory:
+            self.authenticator.config.work_dir = directory
+            _CleanupQueue(
+                os.path.join(directory, "dns-stackit-cleanup-queue.jsonl")
+            ).push("test_domain", "validation_name_test", "validation_test")
+
+            self.authenticator._drain_cleanup_queue()
+
+        mock_get_client.return_value.del_txt_record.assert_called_once_with(
+            "test_domain", "validation_name_test", "validation_test"
+        )
+        self.assertIsNotNone(self.authenticator._cleanup_queue)
+
+    @patch.object(Authenticator, "conf")
+    @patch.object(Authenticator, "_configure_credentials")
+    def test_setup_credentials_with_routing_only(
+        self, mock_configure_credentials, mock_conf
+    ):
+        mock_conf.side_effect = {"routing": "routing.ini"}.get
+
+        self.authenticator._setup_credentials()
+
+        mock_configure_credentials.assert_not_called()
+
+    @patch("certbot.plugins.dns_common.validate_file_permissions")
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="[example.com]\nproject_id = project_a\nauth_token = token%a\n\n"
+        "[Sub.Example.com.]\nproject_id = project_b\nservice_account = sa.json\n"
+        "base_url = https://other.url\n",
+    )
+    def test_load_routes(self, mock_file, mock_validate_file_permissions):
+        routes = self.authenticator._load_routes("routing.ini")
+
+        mock_validate_file_permissions.assert_called_once_with("routing.ini")
+        self.assertEqual(
+            routes,
+            [
+                _Route("example.com", "project_a", auth_token="token%a"),
+                _Route(
+                    "sub.example.com",
+                    "project_b",
+                    service_account="sa.json",
+                    base_url="https://other.url",
+                ),
+            ],
+        )
+
+    @patch("certbot.plugins.dns_common.validate_file_permissions")
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="[example.com]\nauth_token = token_a\n",
+    )
+    def test_load_routes_without_project(self, mock_file, mock_validate):
+        with self.assertRaises(errors.PluginError):
+            self.authenticator._load_routes("routing.ini")
+
+    @patch("certbot.plugins.dns_common.validate_file_permissions")
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="project_id = project_a\n",
+    )
+    def test_load_routes_malformed(self, mock_file, mock_validate):
+        with self.assertRaises(errors.PluginError):
+            self.authenticator._load_routes("routing.ini")
+
+    def test_find_route(self):
+        self.authenticator._routes = [
+            _Route("example.com", "project_a", auth_token="token_a"),
+            _Route("sub.example.com", "project_b", auth_token="token_b"),
+        ]
+
+        self.assertEqual(
+            self.authenticator._find_route("a.sub.example.com").project_id, "project_b"
+        )
+        self.assertEqual(
+            self.authenticator._find_route("Example.com.").project_id, "project_a"
+        )
+        self.assertIsNone(self.authenticator._find_route("notexample.com"))
+
+    @patch.object(Authenticator, "conf", return_value=None)
+    def test_get_stackit_client_per_project(self, mock_conf):
+        self.authenticator._routes = [
+            _Route("example.com", "project_a", auth_token="token_a"),
+            _Route("example.net", "project_a", auth_token="token_a"),
+            _Route("example.org", "project_b", auth_token="token_b"),
+            _Route("example.de", "project_a", auth_token="token_c"),
+        ]
+
+        client_a = self.authenticator._get_stackit_client("www.example.com")
+        client_b = self.authenticator._get_stackit_client("example.org")
+        client_c = self.authenticator._get_stackit_client("example.de")
+
+        self.assertIs(self.authenticator._get_stackit_client("example.net"), client_a)
+        # same project, other credentials
+        self.assertIsNot(client_c, client_a)
+        self.assertEqual(client_c.auth_token, "token_c")
+        self.assertEqual(client_a.project_id, "project_a")
+        self.assertEqual(client_b.project_id, "project_b")
+        self.assertEqual(client_b.auth_token, "token_b")
+
+    @patch.object(Authenticator, "conf", return_value="routing.ini")
+    def test_get_stackit_client_without_route(self, mock_conf):
+        self.authenticator._routes = [
+            _Route("example.com", "project_a", auth_token="token_a")
+        ]
+
+        with self.assertRaises(errors.PluginError):
+            self.authenticator._get_stackit_client("example.org")
+
+    @patch.object(Authenticator, "_get_token_cache", return_value=None)
+    @patch.object(Authenticator, "_generate_jwt_token")
+    def test_create_token_pool(self, mock_generate_jwt_token, mock_get_token_cache):
+        mock_generate_jwt_token.side_effect = ["token_a", "token_b", "token_c"]
+
+        pool = self.authenticator._create_token_pool("a.json, b.json,")
+
+        self.assertEqual([t.token for t in pool.tokens], ["token_a", "token_b"])
+        self.assertEqual(pool.tokens[1].refresh(), "token_c")
+        mock_generate_jwt_token.assert_called_with("b.json")
+
+    @patch.object(Authenticator, "_generate_jwt_token")
+    @patch.object(Authenticator, "_get_token_cache")
+    def test_get_access_token_from_cache(
+        self, mock_get_token_cache, mock_generate_jwt_token
+    ):
+        mock_get_token_cache.return_value.get.side_effect = ["cached", None]
+        mock_generate_jwt_token.return_value = "fresh"
+
+        self.assertEqual(self.authenticator._get_access_token("sa.json"), "cached")
+        self.assertEqual(self.authenticator._get_access_token("sa.json"), "fresh")
+        mock_generate_jwt_token.assert_called_once_with("sa.json")
+        mock_get_token_cache.return_value.put.assert_called_once_with(
+            os.path.abspath("sa.json"), "fresh"
+        )
+
+    @patch.object(Authenticator, "_create_stackit_client")
+    def test_get_stackit_client_is_reused(self, mock_create_client):
+        self.authenticator.credentials = Mock()
+        client = self.authenticator._get_stackit_client()
+
+        self.assertIs(self.authenticator._get_stackit_client(), client)
+        mock_create_client.assert_called_once()
+
     @patch.object(Authenticator, "_get_stackit_client")
     def test_cleanup(self, mock_get_client):
         mock_client = Mock()
@@ -336,7 +1682,7 @@ class TestAuthenticator(unittest.TestCase):
     @patch("requests.post")
     def test_request_access_token_success(self, mock_post):
         mock_response = mock_post.return_value
-        mock_response.raise_for_status = lambda: None
+        mock_response.status_code = 200
         mock_response.json.return_value = {"access_token": "mocked_access_token"}
 
         result = self.authenticator._request_access_token("jwt_token_example")
@@ -348,20 +1694,30 @@ class TestAuthenticator(unittest.TestCase):
                 "assertion": "jwt_token_example",
             },
             headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=(5.0, 30.0),
         )
         self.assertEqual(result, "mocked_access_token")
 
     @patch("requests.post")
-    def test_request_access_token_failure_raises_http_error(self, mock_post):
+    def test_request_access_token_failure_raises_stackit_error(self, mock_post):
         mock_response = Response()
         mock_response.status_code = 403
         mock_post.return_value = mock_response
-        mock_response.raise_for_status = lambda: (_ for _ in ()).throw(HTTPError())
 
-        with self.assertRaises(errors.PluginError):
+        with self.assertRaises(StackitError):
             self.authenticator._request_access_token("jwt_token_example")
         mock_post.assert_called_once()
 
+    @patch("requests.post", side_effect=ConnectTimeout("timed out"))
+    def test_request_access_token_fails_fast(self, mock_post):
+        for _ in range(5):
+            with self.assertRaises(StackitError):
+                self.authenticator._request_access_token("jwt_token_example")
+        with self.assertRaises(StackitError):
+            self.authenticator._request_access_token("jwt_token_example")
+
+        self.assertEqual(mock_post.call_count, 5)
+
     @patch(
         "builtins.open",
         new_callable=mock_open,
@@ -76,7 +76,11 @@ setup(
         "dev": dev_requires,
     },
     entry_points={
-        "certbot.plugins": ["dns-stackit = certbot_dns_stackit.stackit:Authenticator"]
+        "certbot.plugins": ["dns-stackit = certbot_dns_stackit.stackit:Authenticator"],
+        "console_scripts": [
+            "stackit-dns-present = certbot_dns_stackit.hooks:present",
+            "stackit-dns-cleanup = certbot_dns_stackit.hooks:cleanup",
+        ],
     },
     test_suite="certbot_dns_stackit",
 )